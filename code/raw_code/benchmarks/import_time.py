@@ -0,0 +1,75 @@
+################################################################################
+##### description #####
+#cold-start benchmark for the command line: times fresh 'python -m pass_the_pigs expected' processes and checks that
+#the median stays under the budget and that numpy, scipy and matplotlib were never imported
+#run from anywhere with: python benchmarks/import_time.py [--runs N] [--budget-ms MS]. exits with status 1 when a check fails
+
+################################################################################
+##### import packages #####
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+################################################################################
+##### settings #####
+raw_code_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) #the directory that holds the pass_the_pigs package
+default_n_runs = 20
+default_budget_ms = 100.0
+heavy_modules = ['numpy', 'scipy', 'matplotlib']
+
+#runs the 'expected' subcommand like python -m does, then reports which heavy modules ended up loaded
+heavy_module_check = '''
+import sys
+from pass_the_pigs.cli import main
+main(['expected'])
+print('loaded:' + ','.join(sorted(module for module in {} if module in sys.modules)))
+'''.format(heavy_modules)
+
+################################################################################
+##### benchmark #####
+def time_cold_start(n_runs):
+    run_times_ms = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'pass_the_pigs', 'expected'], cwd=raw_code_dir, check=True, stdout=subprocess.DEVNULL)
+        run_times_ms.append( (time.perf_counter() - start) * 1000 )
+    return run_times_ms
+
+def loaded_heavy_modules():
+    output = subprocess.run([sys.executable, '-c', heavy_module_check], cwd=raw_code_dir, check=True, capture_output=True, text=True).stdout
+    loaded = output.strip().splitlines()[-1][len('loaded:'):]
+    return [module for module in loaded.split(',') if module]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="cold-start time of 'python -m pass_the_pigs expected'")
+    parser.add_argument('--runs', type=int, default=default_n_runs)
+    parser.add_argument('--budget-ms', type=float, default=default_budget_ms)
+    args = parser.parse_args(argv)
+
+    interpreter_times_ms = []
+    for _ in range(args.runs): #bare interpreter start-up, for reference
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        interpreter_times_ms.append( (time.perf_counter() - start) * 1000 )
+    run_times_ms = time_cold_start(args.runs)
+    median_ms = statistics.median(run_times_ms)
+    print( 'python -c pass: median {:0.1f} ms'.format( statistics.median(interpreter_times_ms) ) )
+    print( 'python -m pass_the_pigs expected: median {:0.1f} ms, min {:0.1f} ms, max {:0.1f} ms over {} runs (budget {:0.0f} ms)'.format( median_ms, min(run_times_ms), max(run_times_ms), args.runs, args.budget_ms ) )
+
+    loaded = loaded_heavy_modules()
+    passed = True
+    if loaded:
+        print( 'FAIL: expected imported ' + ', '.join(loaded) )
+        passed = False
+    if median_ms > args.budget_ms:
+        print( 'FAIL: median cold start is over budget' )
+        passed = False
+    if passed:
+        print( 'OK' )
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+################################################################################
+##### description #####
+#throughput benchmarks for the stages of the analysis: roll sampling, the batch game simulator (from batches of 1 game, which time its fixed
+#per-call overhead, up to 100k), the batch comparison of the two strategies (simulation + t-test), rendering the four figures and the bootstrap,
+#each at several sizes
+#every case is run once to warm up (imports, compilation, caches) and then timed --repeats times. each timing repeats the call until it has run for
+#at least min_sample_seconds (like timeit's autorange), so millisecond cases are not lost in timer noise. the best time per call sets the throughput
+#the results are checked against the baselines recorded in benchmarks/baselines.json: a case fails when its throughput drops more than
+#--tolerance below its baseline. baselines depend on the machine, so record new ones with --save-baseline after moving to another machine
+#run with: python benchmarks/pipeline_benchmarks.py [--cases SUBSTRING] [--repeats N] [--json PATH] [--save-baseline]. exits with status 1 on a regression
+
+################################################################################
+##### import packages #####
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #the directory that holds the pass_the_pigs package
+from pass_the_pigs.atomic_files import atomic_write
+from pass_the_pigs.bootstrap import bootstrap_strategy_quantities
+from pass_the_pigs.model import default_per_pig_per_roll_probs, expected_scores
+from pass_the_pigs.outcome_table import build_roll_outcome_table
+from pass_the_pigs.simulation import draw_roll_scores, simulate_games_batch
+from pass_the_pigs.simulator import compare_simulated_turns, simulate_policy_games
+
+################################################################################
+##### settings #####
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+default_n_repeats = 5
+min_sample_seconds = 0.2
+default_tolerance = 0.3 #fail below 70% of the baseline throughput
+roll_sampling_sizes = [100000, 1000000]
+simulated_game_sizes = [1, 1000, 10000, 100000]
+comparison_game_sizes = [1000, 10000]
+figure_game_sizes = [1000, 10000, 100000]
+bootstrap_replicate_sizes = [100, 1000]
+
+################################################################################
+##### benchmark cases #####
+#each case builds its inputs and returns (run, n_items, unit): run() is the timed call and n_items how many units it processes
+def roll_sampling_lookup_case(outcome_table, n_rolls):
+    rng = np.random.default_rng(0)
+    run = lambda: draw_roll_scores(rng, n_rolls, outcome_table.all_possible_scores_array, outcome_table.all_possible_score_cumulative_probabilities_array)
+    return run, n_rolls, 'rolls'
+
+def roll_sampling_alias_case(outcome_table, n_rolls):
+    rng = np.random.default_rng(0)
+    run = lambda: outcome_table.sample_roll_scores(rng, n_rolls)
+    return run, n_rolls, 'rolls'
+
+def simulate_games_batch_case(outcome_table, n_games):
+    strategy_2_target_score = expected_scores()['strategy_2_target_score']
+    run = lambda: simulate_games_batch(n_games, 100, outcome_table.all_possible_scores_array, outcome_table.all_possible_score_cumulative_probabilities_array, target_turn_score=strategy_2_target_score, rng=np.random.default_rng(0))
+    return run, n_games, 'games'
+
+def batch_comparison_case(outcome_table, n_games):
+    expected = expected_scores()
+    policies = [(expected['strategy_1_target_rolls'], np.inf), (np.inf, expected['strategy_2_target_score'])]
+    def run():
+        simulated = [simulate_policy_games(outcome_table, policy, n_games=n_games, seed=seed) for seed, policy in enumerate(policies)]
+        return compare_simulated_turns(simulated[1]['total_turns_to_target_game_score'], simulated[0]['total_turns_to_target_game_score'])
+    return run, 2*n_games, 'games'
+
+#the games are simulated outside the timed call; only building and rendering the figures (as pdf, like save_figure) is timed
+def figures_case(outcome_table, n_games):
+    from pass_the_pigs.plotting import expected_score_curves, load_pyplot, plot_expected_score_and_pig_out_odds, plot_strategy_1_expected_outcome, plot_strategy_2_expected_outcome, plot_turns_to_target_histograms
+    expected = expected_scores()
+    turns_1 = simulate_policy_games(outcome_table, (expected['strategy_1_target_rolls'], np.inf), n_games=n_games, seed=0)['total_turns_to_target_game_score']
+    turns_2 = simulate_policy_games(outcome_table, (np.inf, expected['strategy_2_target_score']), n_games=n_games, seed=1)['total_turns_to_target_game_score']
+    curves = expected_score_curves(outcome_table)
+    plt = load_pyplot(headless=True)
+    def run():
+        figures = [plot_expected_score_and_pig_out_odds(curves, headless=True), plot_strategy_1_expected_outcome(curves, headless=True), plot_strategy_2_expected_outcome(curves, headless=True), plot_turns_to_target_histograms(turns_1, turns_2, headless=True)]
+        for fig in figures:
+            fig.savefig(io.BytesIO(), format='pdf')
+            plt.close(fig)
+    return run, 4, 'figures'
+
+#resamples a log of 300 rolls drawn from the default orientation probabilities, so the case does not depend on the excel file
+def bootstrap_case(outcome_table, n_replicates):
+    pig_orientations = np.random.default_rng(0).choice(len(default_per_pig_per_roll_probs), size=(300, 2), p=list(default_per_pig_per_roll_probs.values()))
+    orientation_counts = np.stack([np.bincount(roll_orientations, minlength=len(default_per_pig_per_roll_probs)) for roll_orientations in pig_orientations])
+    run = lambda: bootstrap_strategy_quantities(orientation_counts, n_replicates=n_replicates, seed=0)
+    return run, n_replicates, 'replicates'
+
+#case name -> (builder, sizes)
+benchmark_cases = {}
+benchmark_cases['roll_sampling_lookup'] = (roll_sampling_lookup_case, roll_sampling_sizes)
+benchmark_cases['roll_sampling_alias'] = (roll_sampling_alias_case, roll_sampling_sizes)
+benchmark_cases['simulate_games_batch'] = (simulate_games_batch_case, simulated_game_sizes)
+benchmark_cases['batch_comparison'] = (batch_comparison_case, comparison_game_sizes)
+benchmark_cases['figures'] = (figures_case, figure_game_sizes)
+benchmark_cases['bootstrap'] = (bootstrap_case, bootstrap_replicate_sizes)
+
+################################################################################
+##### run the cases #####
+def time_case(run, n_repeats):
+    start = time.perf_counter()
+    run() #warm up, and find how many calls fill one sample
+    n_calls = max(1, int(min_sample_seconds / max(time.perf_counter() - start, 1e-9)))
+    run_times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            run()
+        run_times.append((time.perf_counter() - start) / n_calls)
+    return run_times
+
+def run_benchmarks(case_filter=None, n_repeats=default_n_repeats):
+    outcome_table = build_roll_outcome_table()
+    results = {}
+    for case_name, (build_case, sizes) in benchmark_cases.items():
+        for size in sizes:
+            case_id = '{}[{}]'.format(case_name, size)
+            if (case_filter is not None) and (case_filter not in case_id):
+                continue
+            run, n_items, unit = build_case(outcome_table, size)
+            run_times = time_case(run, n_repeats)
+            results[case_id] = {'best_seconds': min(run_times), 'median_seconds': statistics.median(run_times), 'unit': unit, 'items_per_second': n_items / min(run_times)}
+    return results
+
+#the throughput of each case relative to its baseline. cases without a baseline are not checked
+def check_against_baselines(results, baselines, tolerance):
+    regressions = []
+    for case_id, result in results.items():
+        if case_id not in baselines:
+            result['relative_to_baseline'] = None
+            continue
+        result['relative_to_baseline'] = result['items_per_second'] / baselines[case_id]['items_per_second']
+        if result['relative_to_baseline'] < 1.0 - tolerance:
+            regressions.append(case_id)
+    return regressions
+
+def machine_description():
+    return {'platform': platform.platform(), 'python': platform.python_version(), 'numpy': np.__version__, 'processor': platform.processor() or platform.machine()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='throughput of the stages of the pass the pigs analysis, checked against recorded baselines')
+    parser.add_argument('--cases', default=None, help='only run cases whose id contains this text, e.g. simulate_games_batch or [10000]')
+    parser.add_argument('--repeats', type=int, default=default_n_repeats)
+    parser.add_argument('--tolerance', type=float, default=default_tolerance, help='allowed drop in throughput below the baseline (default %(default)s)')
+    parser.add_argument('--baselines', default=default_baseline_path)
+    parser.add_argument('--save-baseline', action='store_true', help='record the results as the new baselines instead of checking them')
+    parser.add_argument('--json', default=None, help='also write the results to this json file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cases, args.repeats)
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as baseline_file:
+            baselines = json.load(baseline_file)['cases']
+    regressions = [] if args.save_baseline else check_against_baselines(results, baselines, args.tolerance)
+
+    for case_id, result in results.items():
+        relative = result.get('relative_to_baseline')
+        print( '{:32s} {:10.4f} s best {:10.4f} s median {:14.0f} {}/s{}'.format( case_id, result['best_seconds'], result['median_seconds'], result['items_per_second'], result['unit'], '' if relative is None else '  ({:0.2f}x baseline)'.format(relative) ) )
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json.dump({'machine': machine_description(), 'cases': results}, json_file, indent=1)
+    if args.save_baseline:
+        baselines.update({case_id: {'items_per_second': result['items_per_second'], 'unit': result['unit']} for case_id, result in results.items()}) #cases that were not run keep their old baseline
+        with atomic_write(args.baselines) as baseline_file:
+            json.dump({'machine': machine_description(), 'cases': baselines}, baseline_file, indent=1, sort_keys=True)
+            baseline_file.write('\n')
+        print( 'Saved baselines to ' + args.baselines )
+        return 0
+    if regressions:
+        print( 'FAIL: throughput more than {:0.0f}% below the baseline for {}'.format( 100*args.tolerance, ', '.join(regressions) ) )
+        return 1
+    print( 'OK' )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+################################################################################
+##### description #####
+#throughput of the scalar policy kernel (policy_kernel.py) in rolls per second on one core, for a lookup-table policy and a compiled callback
+#run with: python benchmarks/policy_kernel_throughput.py [--games N] [--target-rolls-per-second R]. exits with status 1 below the target
+#without numba the kernel runs as plain python; the benchmark then reports its speed with a smaller default game count and does not fail
+
+################################################################################
+##### import packages #####
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #the directory that holds the pass_the_pigs package
+from pass_the_pigs.outcome_table import build_roll_outcome_table
+from pass_the_pigs.policy_kernel import limits_roll_table, numba, play_policy_games, table_roll_again
+
+################################################################################
+##### settings #####
+default_n_games = 1000000
+default_n_games_without_numba = 2000
+default_target_rolls_per_second = 10.0e6
+
+################################################################################
+##### a callback policy: hold at 20, or as soon as holding wins #####
+def hold_at_20_roll_again(seat, turn_score, rolls_this_turn, game_scores, policy_data):
+    return (turn_score < policy_data[0]) and (game_scores[seat] + turn_score < policy_data[1])
+
+################################################################################
+##### benchmark #####
+def time_policy(outcome_table, roll_again, policy_data, n_games):
+    results = {}
+    results['winner_seat'] = np.empty(n_games, dtype=np.int64)
+    results['total_turns'] = np.empty(n_games, dtype=np.int64)
+    results['total_rolls'] = np.empty(n_games, dtype=np.int64)
+    results['game_scores'] = np.empty((n_games, 2), dtype=np.int64)
+    play_policy_games(outcome_table, roll_again, policy_data, min(n_games, 100), seed=0) #compile outside the timed run
+    start = time.perf_counter()
+    play_policy_games(outcome_table, roll_again, policy_data, n_games, seed=1, results=results)
+    run_time = time.perf_counter() - start
+    return results['total_rolls'].sum() / run_time, run_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='rolls per second of the scalar policy kernel')
+    parser.add_argument('--games', type=int, default=None)
+    parser.add_argument('--target-rolls-per-second', type=float, default=default_target_rolls_per_second)
+    args = parser.parse_args(argv)
+    n_games = args.games if args.games is not None else (default_n_games if numba is not None else default_n_games_without_numba)
+
+    outcome_table = build_roll_outcome_table()
+    if numba is not None:
+        hold_at_20 = numba.njit(hold_at_20_roll_again)
+    else:
+        hold_at_20 = hold_at_20_roll_again
+    print( 'numba: {}'.format( numba.__version__ if numba is not None else 'not installed (plain python kernel)' ) )
+    passed = True
+    for policy_name, roll_again, policy_data in [('strategy 2 lookup table', table_roll_again, limits_roll_table(target_turn_score=30.67)[None]), ('hold at 20 callback', hold_at_20, np.array([20, 100]))]:
+        rolls_per_second, run_time = time_policy(outcome_table, roll_again, policy_data, n_games)
+        print( '{}: {:0.1f}M rolls/s ({} 2-player games in {:0.2f} s)'.format( policy_name, rolls_per_second/1e6, n_games, run_time ) )
+        passed &= rolls_per_second >= args.target_rolls_per_second
+    if numba is None:
+        return 0
+    print( 'OK' if passed else 'FAIL: below {:0.0f}M rolls/s'.format( args.target_rolls_per_second/1e6 ) )
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
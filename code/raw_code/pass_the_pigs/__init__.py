@@ -0,0 +1,5 @@
+################################################################################
+##### description #####
+#helper modules for the 'pass the pigs' analysis in passing_pigs_v1.1.1.py
+#model.py (plain python expected scores), simulator.py (games of a turn policy), plotting.py (the figures) and cli.py (python -m pass_the_pigs)
+#nothing is imported here, so importing the package stays cheap and each module only pulls in what it uses
@@ -0,0 +1,11 @@
+################################################################################
+##### description #####
+#entry point for python -m pass_the_pigs; see cli.py
+
+################################################################################
+##### import packages #####
+import sys
+
+from pass_the_pigs.cli import main
+
+sys.exit(main())
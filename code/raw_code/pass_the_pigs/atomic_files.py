@@ -0,0 +1,35 @@
+################################################################################
+##### description #####
+#atomic file writes: everything is written to a temporary file next to the target, which then replaces the target in one os.replace,
+#so a reader (or a run that resumes after an interruption) never sees a half-written file
+#the temporary file keeps the target's extension (state.tmp.json, sweep.tmp.npz), because np.savez and friends add an extension that is missing
+
+################################################################################
+##### import packages #####
+import os
+from contextlib import contextmanager
+
+################################################################################
+##### atomic writes #####
+def temporary_path_for(path):
+    root, extension = os.path.splitext(path)
+    return root + '.tmp' + extension
+
+#yields the temporary path to write to. it replaces path when the block finishes, and is removed if the block raises
+@contextmanager
+def atomic_path(path):
+    temporary_path = temporary_path_for(path)
+    try:
+        yield temporary_path
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    os.replace(temporary_path, path)
+
+#same, with the temporary file already open
+@contextmanager
+def atomic_write(path, mode='w'):
+    with atomic_path(path) as temporary_path:
+        with open(temporary_path, mode) as temporary_file:
+            yield temporary_file
@@ -0,0 +1,323 @@
+################################################################################
+##### description #####
+#bootstrap and sensitivity analysis of the strategy conclusions. the orientation probabilities come from a small hand-collected sample
+#(pig_outcomes_per_roll.xlsx), so the turn targets of both strategies and everything computed from them carry sampling uncertainty
+#the bootstrap resamples the rolls of the log with replacement thousands of times. a whole replicate is one row of stacked arrays, and every
+#number the analysis prints is recomputed for all replicates at once with the exact formulas (model.py, exact.py) instead of simulating games:
+#the expected scores and turn targets, the distribution of points per turn, the distribution of turns to the target game score, the comparison
+#of the two strategies and the 2-player tournament. the spread of a quantity over the replicates gives its confidence band
+#the sensitivity analysis moves each orientation probability up and down a little (rescaling the others) and reports the derivative of every quantity
+#note that resampling rolls never produces an orientation that is missing from the log (a leaning jowler, for example); the sensitivity analysis covers those
+
+################################################################################
+##### import packages #####
+import math
+
+import numpy as np
+
+from pass_the_pigs.exact import n_roll_points_pmf, points_to_quarter_points, quarter_points_per_point, roll_count_turn_pmf_from_points, stacked_pmf_moments, stacked_turns_comparison, threshold_to_quarter_points, threshold_turn_pmf_from_visits, turn_score_visits_on_grid, visits_below_target
+from pass_the_pigs.model import default_per_roll_points, roll_score
+from pass_the_pigs.roll_data import orientation_columns, pigs_per_roll
+
+################################################################################
+##### settings #####
+default_n_replicates = 2000
+default_confidence = 0.95
+default_replicates_per_chunk = 1000 #replicates computed together; bounds the memory of the stacked turns-to-target arrays
+default_tolerance = 1e-10 #probability mass left over when a stacked distribution is considered complete
+default_max_turns = 100000
+default_sensitivity_delta = 0.01
+
+#what each quantity is, in the words the analysis prints it with
+quantity_descriptions = {}
+quantity_descriptions['per_pig_probs'] = 'orientation probabilities (per pig)'
+quantity_descriptions['P_pig_out'] = 'pig out odds per roll'
+quantity_descriptions['one_roll_expected_score'] = 'expected score from one roll (including pig out)'
+quantity_descriptions['one_roll_expected_score_no_pig_out'] = 'expected score from one roll (assuming no pig out)'
+quantity_descriptions['strategy_1_target_rolls'] = 'strategy 1: target rolls per turn'
+quantity_descriptions['strategy_1_avg_score'] = 'strategy 1: expected points per turn (eq. 4)'
+quantity_descriptions['strategy_1_turn_points_mean'] = 'strategy 1: exact points per turn'
+quantity_descriptions['strategy_1_turn_points_std'] = 'strategy 1: standard deviation of points per turn'
+quantity_descriptions['strategy_1_prob_bank_points'] = 'strategy 1: probability of banking any points'
+quantity_descriptions['strategy_1_rolls_per_turn'] = 'strategy 1: rolls per turn'
+quantity_descriptions['strategy_2_target_score'] = 'strategy 2: target turn score'
+quantity_descriptions['strategy_2_avg_rolls'] = 'strategy 2: expected rolls per turn (eq. 7)'
+quantity_descriptions['strategy_2_turn_points_mean'] = 'strategy 2: exact points per turn'
+quantity_descriptions['strategy_2_turn_points_std'] = 'strategy 2: standard deviation of points per turn'
+quantity_descriptions['strategy_2_prob_bank_target'] = 'strategy 2: probability of banking the target score'
+quantity_descriptions['strategy_2_rolls_per_turn'] = 'strategy 2: rolls per turn'
+quantity_descriptions['strategy_1_mean_turns'] = 'mean number of turns to the target game score for WS1'
+quantity_descriptions['strategy_2_mean_turns'] = 'mean number of turns to the target game score for WS2'
+quantity_descriptions['mean_turns_difference'] = 'mean turns of WS2 minus mean turns of WS1'
+quantity_descriptions['prob_strategy_2_fewer_turns'] = 'probability that WS2 reaches the target game score in fewer turns than WS1'
+quantity_descriptions['t_test_p_value'] = 't-test p-value for the simulated games (at the exact means and variances)'
+quantity_descriptions['win_rate_matrix'] = 'tournament: probability that the row policy beats the column policy'
+quantity_descriptions['win_rate'] = 'tournament: share of games won by each policy'
+quantity_descriptions['first_mover_win_rate'] = 'tournament: share of games won by the player who moves first'
+
+################################################################################
+##### resample the rolls of a log #####
+#orientation_counts has one row per roll, with the number of pigs in each orientation (as read by roll_data.iter_roll_log_batches)
+#drawing n rolls with replacement only depends on how often each distinct row occurs, so a replicate is one multinomial draw over the distinct rows
+#returns the number of pigs in each orientation, one row per replicate
+def resample_pig_counts(orientation_counts, n_replicates, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    orientation_counts = np.asarray(orientation_counts, dtype=np.int64)
+    if len(orientation_counts) == 0:
+        raise ValueError('the roll log has no rolls to resample')
+    distinct_rows, row_counts = np.unique(orientation_counts, axis=0, return_counts=True)
+    resampled_row_counts = rng.multinomial(len(orientation_counts), row_counts / row_counts.sum(), size=n_replicates)
+    return resampled_row_counts @ distinct_rows
+
+################################################################################
+##### stacked roll distributions #####
+#per_pig_probs has one row of orientation probabilities (in orientation_columns order) per replicate
+#returns the probability of scoring each number of quarter points in one roll, one row per replicate, like exact.roll_points_pmf
+def stacked_roll_points_pmfs(per_pig_probs, per_roll_points=None):
+    if per_roll_points is None:
+        per_roll_points = default_per_roll_points
+    per_pig_probs = np.atleast_2d(np.asarray(per_pig_probs, dtype=float))
+    joint_quarter_points = points_to_quarter_points([roll_score(orientation_a, orientation_b, per_roll_points) for orientation_a in orientation_columns for orientation_b in orientation_columns])
+    joint_probabilities = (per_pig_probs[:, :, None] * per_pig_probs[:, None, :]).reshape(len(per_pig_probs), -1) #pig A by pig B, like the outcome table
+    scatter = np.zeros((len(joint_quarter_points), joint_quarter_points.max()+1))
+    scatter[np.arange(len(joint_quarter_points)), joint_quarter_points] = 1.0
+    return joint_probabilities @ scatter
+
+#model.expected_scores for every replicate at once; each entry is an array with one value per replicate
+def stacked_expected_scores(roll_pmfs):
+    if np.any(roll_pmfs[:, 0] <= 0):
+        raise ValueError('a replicate never pigs out, so the strategies never stop rolling')
+    points = np.arange(roll_pmfs.shape[1]) / quarter_points_per_point
+    expected = {}
+    expected['P_pig_out'] = roll_pmfs[:, 0]
+    expected['P_not_pig_out'] = 1.0 - expected['P_pig_out']
+    expected['one_roll_expected_score'] = roll_pmfs @ points
+    expected['one_roll_expected_score_no_pig_out'] = expected['one_roll_expected_score'] / expected['P_not_pig_out']
+    expected['strategy_1_target_rolls'] = expected['P_not_pig_out'] / expected['P_pig_out']
+    expected['strategy_1_avg_score'] = expected['strategy_1_target_rolls'] * expected['one_roll_expected_score_no_pig_out']
+    expected['strategy_2_target_score'] = (expected['one_roll_expected_score_no_pig_out'] * expected['P_not_pig_out']) / expected['P_pig_out']
+    expected['strategy_2_avg_rolls'] = expected['strategy_2_target_score'] / expected['one_roll_expected_score_no_pig_out']
+    return expected
+
+################################################################################
+##### stacked turn distributions #####
+#both return (turn_pmfs, rolls_per_turn): the quarter-point distribution of the points banked per turn (one row per replicate, padded with zeros)
+#and the expected number of rolls per turn. the limits are arrays with one value per replicate, since the targets change from replicate to replicate
+
+#strategy 1: roll ceil(target_turn_rolls) times unless the turn pigs out first. replicates with the same number of rolls share one fft power
+#(exact.n_roll_points_pmf, on one row per replicate)
+def stacked_roll_count_turn_pmfs(roll_pmfs, target_turn_rolls):
+    n_turn_rolls = np.ceil(np.broadcast_to(target_turn_rolls, len(roll_pmfs))).astype(np.int64)
+    if np.any(n_turn_rolls <= 0):
+        raise ValueError('a turn must allow at least one roll')
+    points_pmfs = np.zeros((len(roll_pmfs), n_turn_rolls.max()*(roll_pmfs.shape[1]-1) + 1))
+    for n_rolls in np.unique(n_turn_rolls):
+        replicates = np.flatnonzero(n_turn_rolls == n_rolls)
+        replicate_points_pmfs = n_roll_points_pmf(roll_pmfs[replicates], n_rolls)
+        points_pmfs[replicates, :replicate_points_pmfs.shape[1]] = replicate_points_pmfs
+    P_not_pig_out = 1.0 - roll_pmfs[:, 0]
+    rolls_per_turn = (1.0 - P_not_pig_out**n_turn_rolls) / roll_pmfs[:, 0] #roll k+1 happens when the first k rolls did not pig out
+    return roll_count_turn_pmf_from_points(points_pmfs), rolls_per_turn
+
+#strategy 2: roll until the turn score reaches target_turn_score unless the turn pigs out first. the expected visits to every turn score below
+#the target are built up score by score for all replicates together (exact.turn_score_visits_on_grid, on one row per replicate); every visit is one roll
+def stacked_threshold_turn_pmfs(roll_pmfs, target_turn_score):
+    target_turn_quarter_points = np.asarray([threshold_to_quarter_points(target) for target in np.broadcast_to(target_turn_score, len(roll_pmfs))], dtype=np.int64)
+    visits = turn_score_visits_on_grid(roll_pmfs, max(target_turn_quarter_points.max(), 1))
+    turn_pmfs = threshold_turn_pmf_from_visits(roll_pmfs, visits, target_turn_quarter_points)
+    rolls_per_turn = visits_below_target(visits, target_turn_quarter_points).sum(axis=1)
+    return turn_pmfs, rolls_per_turn
+
+#any fixed policy (target_turn_rolls, target_turn_score), with one of the two limits infinite
+def stacked_policy_turn_pmfs(roll_pmfs, policy):
+    target_turn_rolls, target_turn_score = policy
+    if np.all(np.isinf(target_turn_score)) and np.all(np.isfinite(target_turn_rolls)):
+        return stacked_roll_count_turn_pmfs(roll_pmfs, target_turn_rolls)
+    if np.all(np.isinf(target_turn_rolls)) and np.all(np.isfinite(target_turn_score)):
+        return stacked_threshold_turn_pmfs(roll_pmfs, target_turn_score)
+    raise ValueError('stacked turn distributions need either a roll limit or a target turn score, not both')
+
+################################################################################
+##### stacked turns-to-target distributions #####
+#exact.turns_to_target_pmf for every replicate at once: each turn convolves the game score distributions with the turn distributions through one
+#stacked fft. replicates leave the stack once they are complete, so the long games of a few replicates do not slow down the rest
+#returns the distributions of the number of turns, one row per replicate (column k: the target is reached on turn k)
+def stacked_turns_to_target_pmfs(turn_pmfs, target_game_score, tolerance=default_tolerance, max_turns=default_max_turns):
+    if np.any(turn_pmfs[:, 1:].sum(axis=1) <= 0):
+        raise ValueError('no turn ever banks points, so the target game score is never reached')
+    target_game_quarter_points = max(threshold_to_quarter_points(target_game_score), 1)
+    if turn_pmfs.shape[1] > target_game_quarter_points + 1: #every score past the target ends the game the same way
+        turn_pmfs = np.concatenate((turn_pmfs[:, :target_game_quarter_points], turn_pmfs[:, target_game_quarter_points:].sum(axis=1, keepdims=True)), axis=1)
+    n_fft = 1 << int(np.ceil(np.log2(target_game_quarter_points + turn_pmfs.shape[1])))
+    turn_pmfs_fft = np.fft.rfft(turn_pmfs, n_fft, axis=1)
+    game_score_pmfs = np.zeros((len(turn_pmfs), target_game_quarter_points))
+    game_score_pmfs[:, 0] = 1.0
+    prob_not_reached = [np.ones(len(turn_pmfs))] #prob_not_reached[k][i]: replicate i has not reached the target after k turns (0 once it left the stack)
+    active = np.arange(len(turn_pmfs))
+    while active.size > 0:
+        if len(prob_not_reached) > max_turns:
+            raise RuntimeError('the turns-to-target distributions did not converge within {} turns'.format(max_turns))
+        game_score_pmfs = np.fft.irfft(np.fft.rfft(game_score_pmfs, n_fft, axis=1) * turn_pmfs_fft, n_fft, axis=1)[:, :target_game_quarter_points]
+        game_score_pmfs[game_score_pmfs < 0] = 0.0 #round-off from the transform
+        remaining = game_score_pmfs.sum(axis=1)
+        prob_not_reached.append(np.zeros(len(turn_pmfs)))
+        prob_not_reached[-1][active] = remaining
+        still_going = remaining > tolerance
+        if not still_going.all():
+            active = active[still_going]
+            game_score_pmfs = game_score_pmfs[still_going]
+            turn_pmfs_fft = turn_pmfs_fft[still_going]
+    prob_not_reached = np.asarray(prob_not_reached).T
+    turns_pmfs = np.zeros(prob_not_reached.shape)
+    turns_pmfs[:, 1:] = np.maximum(prob_not_reached[:, :-1] - prob_not_reached[:, 1:], 0.0)
+    return turns_pmfs
+
+################################################################################
+##### every quantity the analysis prints, for stacked orientation probabilities #####
+#the tournament is a 2-player round robin of WS1, WS2 and other_tournament_policies, with every pair of policies moving first equally often
+#a player who moves first wins when it reaches the target game score on the same turn as the other player, or sooner
+#n_simulated_games sets the size of the simulated samples whose t-test p-value is reported
+#returns a dictionary of arrays with one row per replicate
+def stacked_strategy_quantities(per_pig_probs, per_roll_points=None, target_game_score=100, n_simulated_games=10000, other_tournament_policies=((np.inf, 20.0),), tolerance=default_tolerance):
+    per_pig_probs = np.atleast_2d(np.asarray(per_pig_probs, dtype=float))
+    roll_pmfs = stacked_roll_points_pmfs(per_pig_probs, per_roll_points)
+    expected = stacked_expected_scores(roll_pmfs)
+    quantities = {'per_pig_probs': per_pig_probs}
+    for name in ['P_pig_out', 'one_roll_expected_score', 'one_roll_expected_score_no_pig_out', 'strategy_1_target_rolls', 'strategy_1_avg_score', 'strategy_2_target_score', 'strategy_2_avg_rolls']:
+        quantities[name] = expected[name]
+
+    policies = [(expected['strategy_1_target_rolls'], np.inf), (np.inf, expected['strategy_2_target_score'])] + list(other_tournament_policies)
+    turns_pmfs = []
+    for policy_index, policy in enumerate(policies):
+        turn_pmfs, rolls_per_turn = stacked_policy_turn_pmfs(roll_pmfs, policy)
+        turns_pmfs.append(stacked_turns_to_target_pmfs(turn_pmfs, target_game_score, tolerance=tolerance))
+        if policy_index < 2:
+            strategy = 'strategy_{}_'.format(policy_index+1)
+            quantities[strategy + 'turn_points_mean'], quantities[strategy + 'turn_points_std'] = stacked_pmf_moments(turn_pmfs, np.arange(turn_pmfs.shape[1]) / quarter_points_per_point)
+            quantities[strategy + 'rolls_per_turn'] = rolls_per_turn
+            quantities[strategy + 'turns_pmfs'] = turns_pmfs[-1]
+            quantities[strategy + ('prob_bank_points' if policy_index == 0 else 'prob_bank_target')] = 1.0 - turn_pmfs[:, 0] #with strategy 2 every turn that does not pig out banks at least the target
+
+    #comparison of the two strategies, like the exact section and the t-test of the analysis
+    mean_turns = []
+    var_turns = []
+    for turns_pmfs_strategy in turns_pmfs[:2]:
+        mean, std = stacked_pmf_moments(turns_pmfs_strategy, np.arange(turns_pmfs_strategy.shape[1], dtype=float))
+        mean_turns.append(mean)
+        var_turns.append(std**2)
+    quantities['strategy_1_mean_turns'], quantities['strategy_2_mean_turns'] = mean_turns
+    quantities['mean_turns_difference'] = mean_turns[1] - mean_turns[0]
+    quantities['prob_strategy_2_fewer_turns'] = stacked_turns_comparison(turns_pmfs[1], turns_pmfs[0])[0]
+    t_stat = quantities['mean_turns_difference'] / np.sqrt((var_turns[0] + var_turns[1]) / n_simulated_games)
+    quantities['t_test_p_value'] = np.asarray([math.erfc(abs(t) / math.sqrt(2)) for t in t_stat]) #two-sided; with thousands of games the t distribution is normal
+
+    #round-robin tournament
+    n_policies = len(policies)
+    n_replicates = len(per_pig_probs)
+    win_rate_matrix = np.full((n_replicates, n_policies, n_policies), np.nan)
+    first_mover_win_rates = []
+    for i in range(n_policies):
+        for j in range(i+1, n_policies):
+            prob_i_fewer_turns, prob_same_turns = stacked_turns_comparison(turns_pmfs[i], turns_pmfs[j])
+            prob_j_fewer_turns = 1.0 - prob_i_fewer_turns - prob_same_turns
+            win_rate_matrix[:, i, j] = prob_i_fewer_turns + 0.5*prob_same_turns #i moves first in half of the games and wins the ties there
+            win_rate_matrix[:, j, i] = 1.0 - win_rate_matrix[:, i, j]
+            first_mover_win_rates.append(0.5*(prob_i_fewer_turns + prob_same_turns) + 0.5*(prob_j_fewer_turns + prob_same_turns))
+    quantities['win_rate_matrix'] = win_rate_matrix
+    quantities['win_rate'] = np.nanmean(win_rate_matrix, axis=2) #every matchup plays the same number of games
+    quantities['first_mover_win_rate'] = np.mean(first_mover_win_rates, axis=0)
+    return quantities
+
+################################################################################
+##### confidence bands #####
+#percentile bands over the replicates, for quantities of any shape. returns estimate, lower and upper as name, name_lower and name_upper
+def confidence_bands(estimates, replicates, confidence=default_confidence):
+    bands = {}
+    for name, estimate in estimates.items():
+        lower, upper = np.percentile(replicates[name], [50*(1-confidence), 50*(1+confidence)], axis=0)
+        bands[name] = estimate
+        bands[name + '_lower'] = lower
+        bands[name + '_upper'] = upper
+    return bands
+
+################################################################################
+##### bootstrap the whole analysis #####
+#orientation_counts: one row per roll of the log, as read by roll_data.iter_roll_log_batches or roll_data.load_cached_rolls
+#the estimates are computed from the log itself and the bands from n_replicates resampled logs, replicates_per_chunk at a time
+#returns the bands (see confidence_bands) of every quantity in quantity_descriptions, plus the replicates themselves
+def bootstrap_strategy_quantities(orientation_counts, n_replicates=default_n_replicates, confidence=default_confidence, per_roll_points=None, target_game_score=100, n_simulated_games=10000, other_tournament_policies=((np.inf, 20.0),), seed=None, replicates_per_chunk=default_replicates_per_chunk):
+    orientation_counts = np.asarray(orientation_counts, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    n_pigs = pigs_per_roll * len(orientation_counts)
+    per_pig_probs = np.vstack((orientation_counts.sum(axis=0)[None, :], resample_pig_counts(orientation_counts, n_replicates, rng))) / n_pigs #row 0 is the log itself
+    chunks = []
+    for first_replicate in range(0, len(per_pig_probs), replicates_per_chunk):
+        quantities = stacked_strategy_quantities(per_pig_probs[first_replicate:first_replicate+replicates_per_chunk], per_roll_points, target_game_score, n_simulated_games, other_tournament_policies)
+        chunks.append({name: quantities[name] for name in quantity_descriptions})
+    replicates = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in quantity_descriptions}
+    estimates = {name: values[0] for name, values in replicates.items()}
+    bootstrap = confidence_bands(estimates, {name: values[1:] for name, values in replicates.items()}, confidence)
+    bootstrap['replicates'] = {name: values[1:] for name, values in replicates.items()}
+    bootstrap['n_replicates'] = n_replicates
+    bootstrap['n_rolls'] = len(orientation_counts)
+    bootstrap['confidence'] = confidence
+    return bootstrap
+
+################################################################################
+##### sensitivity to each orientation probability #####
+#each orientation probability is moved by delta in both directions (one direction at the edges of [0, 1]) while the others are rescaled to keep the total at 1,
+#and every quantity is recomputed. all the moved probabilities are stacked and computed in one call
+#returns derivatives[name], the change in the quantity per unit change in each orientation probability (first axis: orientation_columns)
+def sensitivity_to_orientation_probs(per_pig_per_roll_probs, delta=default_sensitivity_delta, per_roll_points=None, target_game_score=100, n_simulated_games=10000, other_tournament_policies=((np.inf, 20.0),)):
+    base_probs = np.asarray([per_pig_per_roll_probs[orientation] for orientation in orientation_columns], dtype=float)
+    moved_probs = []
+    steps = []
+    for orientation_index, prob in enumerate(base_probs):
+        up = min(prob + delta, 1.0)
+        down = max(prob - delta, 0.0)
+        for new_prob in [up, down]:
+            others = np.delete(base_probs, orientation_index)
+            others = others * (1.0 - new_prob) / others.sum() if others.sum() > 0 else np.full(len(others), (1.0 - new_prob) / len(others))
+            moved_probs.append(np.insert(others, orientation_index, new_prob))
+        steps.append(up - down)
+    quantities = stacked_strategy_quantities(np.asarray(moved_probs), per_roll_points, target_game_score, n_simulated_games, other_tournament_policies)
+    sensitivity = {'orientations': list(orientation_columns), 'delta': delta, 'derivatives': {}}
+    steps = np.asarray(steps)
+    for name in quantity_descriptions:
+        if name == 'per_pig_probs':
+            continue
+        values = quantities[name]
+        steps_shape = (-1,) + (1,)*(values.ndim-1)
+        sensitivity['derivatives'][name] = (values[0::2] - values[1::2]) / steps.reshape(steps_shape)
+    return sensitivity
+
+################################################################################
+##### printable summaries #####
+#one line per quantity (per orientation, policy or matchup for the array quantities): estimate and band
+def band_summary_lines(bands, policy_names=None):
+    n_policies = len(bands['win_rate'])
+    if policy_names is None:
+        policy_names = ['WS1', 'WS2'] + ['policy {}'.format(i+1) for i in range(2, n_policies)]
+    lines = []
+    for name, description in quantity_descriptions.items():
+        estimate, lower, upper = np.asarray(bands[name]), np.asarray(bands[name + '_lower']), np.asarray(bands[name + '_upper'])
+        number_format = '{:0.3g}' if name == 't_test_p_value' else '{:0.3f}'
+        line_format = '  {}: ' + number_format + ' (' + number_format + ' - ' + number_format + ')'
+        if name == 'per_pig_probs':
+            lines += [line_format.format('{} probability'.format(orientation), estimate[k], lower[k], upper[k]) for k, orientation in enumerate(orientation_columns) if upper[k] > 0]
+        elif name == 'win_rate_matrix':
+            lines += [line_format.format('tournament: {} beats {}'.format(policy_names[i], policy_names[j]), estimate[i, j], lower[i, j], upper[i, j]) for i in range(n_policies) for j in range(i+1, n_policies)]
+        elif name == 'win_rate':
+            lines += [line_format.format('tournament: share of games won by {}'.format(policy_names[i]), estimate[i], lower[i], upper[i]) for i in range(n_policies)]
+        else:
+            lines.append(line_format.format(description, estimate, lower, upper))
+    return lines
+
+#the derivative of each named quantity with respect to every orientation probability
+def sensitivity_summary_lines(sensitivity, names):
+    lines = []
+    for name in names:
+        derivatives = ', '.join('{} {:+0.2f}'.format(orientation, derivative) for orientation, derivative in zip(sensitivity['orientations'], sensitivity['derivatives'][name]))
+        lines.append('  {}: {}'.format(quantity_descriptions[name], derivatives))
+    return lines
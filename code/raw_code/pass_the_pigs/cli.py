@@ -0,0 +1,229 @@
+################################################################################
+##### description #####
+#command line for the 'pass the pigs' analysis: python -m pass_the_pigs {expected,simulate,compare,plot,bootstrap,optimal,sweep} [options]
+#every subcommand imports only what it needs, so 'expected' never loads numpy, scipy or matplotlib, and 'plot' draws with the
+#non-interactive 'Agg' backend and saves the figures instead of showing them
+#'optimal' exits with status 1 when the solved policy does not beat both strategies head to head
+#--timings PATH writes the time spent in the subcommand, the games, turns and rolls simulated, and (with --profile) the slowest functions as json
+
+################################################################################
+##### import packages #####
+import argparse
+import math
+
+from pass_the_pigs.model import expected_scores
+
+################################################################################
+##### settings #####
+default_n_games = 10000
+default_target_game_score = 100
+default_seed = 1
+default_roll_log_path = '../../pig_outcomes_per_roll.xlsx' #relative to code/raw_code, like passing_pigs_v1.1.1.py
+default_roll_log_cache_dir = '../../data_cache/roll_log/'
+default_policy_dir = '../../data_cache/optimal_policy/'
+default_sweep_dir = '../../data_cache/sweep/'
+
+################################################################################
+##### the two turn policies, as (target_turn_rolls, target_turn_score) #####
+def strategy_policies(expected):
+    policies = {}
+    policies[1] = (expected['strategy_1_target_rolls'], math.inf) #roll a set number of times
+    policies[2] = (math.inf, expected['strategy_2_target_score']) #roll until the turn score reaches a target
+    return policies
+
+################################################################################
+##### subcommands #####
+def run_expected(args):
+    expected = expected_scores()
+    print( 'Pig out odds per role = {:0.3f}'.format( expected['P_pig_out'] ) )
+    print( 'Expected score from one role (including pig out) = {:0.2f}'.format( expected['one_roll_expected_score'] ) )
+    print( 'Expected score from one role (assuming no pig out) = {:0.2f}'.format( expected['one_roll_expected_score_no_pig_out'] ) )
+    print( '  strategy 1: stop rolling pigs after {:0.2f} rolls'.format( expected['strategy_1_target_rolls'] ) )
+    print( '  strategy 1: expect to score {:0.2f} points per turn, on average'.format( expected['strategy_1_avg_score'] ) )
+    print( '  strategy 2: stop rolling pigs after obtaining a target score >= {:0.2f} points'.format( expected['strategy_2_target_score'] ) )
+    print( '  strategy 2: expect to roll {:0.2f} times, on average'.format( expected['strategy_2_avg_rolls'] ) )
+
+#simulated games of both strategies from independent random streams, keyed by strategy number
+def simulate_strategies(args, strategies):
+    import numpy as np
+    from pass_the_pigs.outcome_table import build_roll_outcome_table
+    from pass_the_pigs.simulator import simulate_policy_games
+    policies = strategy_policies(expected_scores())
+    outcome_table = build_roll_outcome_table()
+    strategy_seeds = np.random.SeedSequence(args.seed).spawn(2) #same streams as passing_pigs_v1.1.1.py, so the same seed plays the same games
+    simulated = {strategy: simulate_policy_games(outcome_table, policies[strategy], n_games=args.games, target_game_score=args.target_game_score, seed=strategy_seeds[strategy-1], n_workers=args.workers) for strategy in strategies}
+    if args.instrumentation is not None:
+        for strategy in strategies:
+            args.instrumentation.count('games', args.games)
+            args.instrumentation.count('turns', simulated[strategy]['total_turns_to_target_game_score'].sum())
+            args.instrumentation.count('rolls', simulated[strategy]['n_rolls'])
+    return simulated
+
+def run_simulate(args):
+    simulated = simulate_strategies(args, [args.strategy])[args.strategy]
+    print( 'The mean number of turns required to achieve the target game score for WS{} is: {:0.2f} (standard deviation {:0.2f}, {} games)'.format( args.strategy, simulated['mean_turns'], simulated['std_turns'], args.games ) )
+
+def run_compare(args):
+    from pass_the_pigs.exact import compare_turns_to_target, turns_to_target_pmf
+    from pass_the_pigs.outcome_table import build_roll_outcome_table
+    from pass_the_pigs.simulator import compare_simulated_turns
+    from pass_the_pigs.turn_distribution import TurnDistributionEngine
+    simulated = simulate_strategies(args, [1, 2])
+    for strategy in [1, 2]:
+        print( 'The mean number of turns required to achieve the target game score for WS{} is: {:0.2f}'.format( strategy, simulated[strategy]['mean_turns'] ) )
+    simulated_comparison = compare_simulated_turns( simulated[2]['total_turns_to_target_game_score'], simulated[1]['total_turns_to_target_game_score'], alpha=args.alpha )
+    print( 'p-value = ', simulated_comparison['two_side_p_val'] )
+    if simulated_comparison['a_fewer_turns']:
+        print( 'The mean number of turns using strategy 2 is less than that of strategy 1' )
+
+    policies = strategy_policies(expected_scores())
+    outcome_table = build_roll_outcome_table()
+    turn_distribution_engine = TurnDistributionEngine(outcome_table.all_possible_scores_array, outcome_table.all_possible_score_probabilities_array)
+    turns_to_target_pmfs = {strategy: turns_to_target_pmf( turn_distribution_engine.turn_pmf(*policies[strategy]), args.target_game_score ) for strategy in [1, 2]}
+    exact_comparison = compare_turns_to_target( turns_to_target_pmfs[2], turns_to_target_pmfs[1] )
+    print( 'The exact mean number of turns required to achieve the target game score for WS1 is: {:0.2f}'.format( exact_comparison['mean_turns_b'] ) )
+    print( 'The exact mean number of turns required to achieve the target game score for WS2 is: {:0.2f}'.format( exact_comparison['mean_turns_a'] ) )
+    print( 'Probability that WS2 reaches the target game score in fewer turns than WS1 = {:0.3f}'.format( exact_comparison['prob_a_fewer_turns'] ) )
+
+def run_plot(args):
+    import os
+    from pass_the_pigs.outcome_table import build_roll_outcome_table
+    from pass_the_pigs.plotting import expected_score_curves, figure_names, plot_expected_score_and_pig_out_odds, plot_strategy_1_expected_outcome, plot_strategy_2_expected_outcome, plot_turns_to_target_histograms, save_figure
+    os.makedirs(args.output_dir, exist_ok=True)
+    curves = expected_score_curves(build_roll_outcome_table())
+    simulated = simulate_strategies(args, [1, 2])
+    figures = {}
+    figures['expected_score_and_pig_out_odds'] = plot_expected_score_and_pig_out_odds(curves, headless=True)
+    figures['strategy_1_expected_outcome'] = plot_strategy_1_expected_outcome(curves, headless=True)
+    figures['strategy_2_expected_outcome'] = plot_strategy_2_expected_outcome(curves, headless=True)
+    figures['turns_to_target_histograms'] = plot_turns_to_target_histograms(simulated[1]['total_turns_to_target_game_score'], simulated[2]['total_turns_to_target_game_score'], headless=True)
+    for figure_key, fig in figures.items():
+        save_figure(fig, args.output_dir, figure_names[figure_key])
+        print( 'Saved figure ' + os.path.join(args.output_dir, figure_names[figure_key]) )
+
+def run_bootstrap(args):
+    from pass_the_pigs.bootstrap import band_summary_lines, bootstrap_strategy_quantities
+    from pass_the_pigs.roll_data import ingest_roll_log, load_cached_rolls
+    ingest_roll_log(args.roll_log, args.cache_dir) #only the rows added since the last run are parsed
+    orientation_counts = load_cached_rolls(args.cache_dir)[1]
+    strategy_bootstrap = bootstrap_strategy_quantities(orientation_counts, n_replicates=args.replicates, confidence=args.confidence, target_game_score=args.target_game_score, n_simulated_games=args.games, seed=args.seed)
+    print( 'Bootstrap estimates and {:0.0f}% confidence bands from {} resampled logs of {} rolls:'.format( 100*args.confidence, args.replicates, strategy_bootstrap['n_rolls'] ) )
+    print( '\n'.join( band_summary_lines(strategy_bootstrap, ['WS1', 'WS2', 'hold at 20']) ) )
+
+#solves the win-maximizing policy (or loads it from --policy-dir) and plays it against both strategies
+def run_optimal(args):
+    import os
+    from pass_the_pigs.atomic_files import atomic_path
+    from pass_the_pigs.optimal_policy import load_policy, play_optimal_policy_head_to_head, save_policy, should_roll, solve_optimal_policy
+    from pass_the_pigs.outcome_table import build_roll_outcome_table
+    outcome_table = build_roll_outcome_table()
+    policy_path = os.path.join(args.policy_dir, 'target_{:g}.npz'.format(args.target_game_score))
+    if os.path.exists(policy_path):
+        policy = load_policy(policy_path)
+    else:
+        policy = solve_optimal_policy(outcome_table.all_possible_scores_array, outcome_table.all_possible_score_probabilities_array, target_game_score=args.target_game_score)
+        os.makedirs(args.policy_dir, exist_ok=True)
+        with atomic_path(policy_path) as temporary_path:
+            save_policy(temporary_path, policy)
+    hold_turn_score = next(turn_score for turn_score in range(1, int(math.ceil(args.target_game_score))+1) if not should_roll(policy, 0, 0, turn_score))
+    print( 'Optimal policy: the first player wins {:0.3f} of the games, and holds at the start of the game with a turn score >= {} points'.format( policy['win_probability'][0, 0, 0], hold_turn_score ) )
+
+    policies = strategy_policies(expected_scores())
+    head_to_head = play_optimal_policy_head_to_head(outcome_table, policy, [policies[1], policies[2]], games_per_opponent=args.games, seed=args.seed, confidence=args.confidence)
+    if args.instrumentation is not None:
+        args.instrumentation.count('games', head_to_head['games'].sum())
+    for opponent_index, strategy in enumerate([1, 2]):
+        print( 'Win rate of the optimal policy against WS{} = {:0.3f} ({:0.0f}% confidence interval {:0.3f} to {:0.3f}, {} games)'.format( strategy, head_to_head['win_rate'][opponent_index], 100*args.confidence, head_to_head['win_rate_lower'][opponent_index], head_to_head['win_rate_upper'][opponent_index], head_to_head['games'][opponent_index] ) )
+    if (head_to_head['win_rate_lower'] <= 0.5).any():
+        print( 'FAIL: the optimal policy does not beat both strategies' )
+        return 1
+    print( 'OK: the optimal policy beats both strategies' )
+    return 0
+
+#exact win rates of every turn policy on the sweep grid against one strategy. the sweep is checkpointed to --output-dir,
+#so an interrupted run picks up where it stopped and a finished one is only read back
+def run_sweep(args):
+    import os
+    import numpy as np
+    from pass_the_pigs.outcome_table import build_roll_outcome_table
+    from pass_the_pigs.sweep import roll_count_policy, sweep_grid, sweep_strategy_grid, turn_score_policy
+    outcome_table = build_roll_outcome_table()
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, 'against_ws{}.npz'.format(args.opponent_strategy))
+    sweep = sweep_strategy_grid(outcome_table.all_possible_scores_array, outcome_table.all_possible_score_probabilities_array, output_path, strategy_policies(expected_scores())[args.opponent_strategy])
+    target_game_score_grid = np.unique(sweep['target_game_score'])
+    best_policies = {}
+    for policy_kind in [roll_count_policy, turn_score_policy]:
+        policy_values = np.unique(sweep['policy_value'][sweep['policy_kind'] == policy_kind])
+        win_rate_grid = sweep_grid(sweep, 'win_rate', policy_kind)
+        best_policy_index = len(policy_values)-1 - np.argmax(win_rate_grid[::-1], axis=0) #target turn scores that round to the same score unit tie, report the largest
+        best_policies[policy_kind] = (policy_values[best_policy_index], np.max(win_rate_grid, axis=0))
+    print( 'Best turn policies against WS{} for the player who moves first (exact win rates, saved to {}):'.format( args.opponent_strategy, output_path ) )
+    for target_index, target_game_score in enumerate(target_game_score_grid):
+        print( '  target game score {:g}: roll {:g} times (win rate {:0.3f}), or roll to a turn score >= {:0.2f} points (win rate {:0.3f})'.format( target_game_score, best_policies[roll_count_policy][0][target_index], best_policies[roll_count_policy][1][target_index], best_policies[turn_score_policy][0][target_index], best_policies[turn_score_policy][1][target_index] ) )
+
+################################################################################
+##### argument parsing #####
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m pass_the_pigs', description="expected scores, simulated games and figures for 'pass the pigs' turn strategies")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    expected_parser = subparsers.add_parser('expected', help='expected score of one roll and the turn targets of both strategies (no simulation)')
+    expected_parser.set_defaults(run=run_expected)
+
+    simulation_parser = argparse.ArgumentParser(add_help=False) #options shared by every subcommand that simulates games
+    simulation_parser.add_argument('--games', type=int, default=default_n_games, help='games simulated per strategy (default %(default)s)')
+    simulation_parser.add_argument('--target-game-score', type=float, default=default_target_game_score, help='points needed to finish a game (default %(default)s)')
+    simulation_parser.add_argument('--seed', type=int, default=default_seed, help='seed of the random streams (default %(default)s)')
+    simulation_parser.add_argument('--workers', type=int, default=1, help='worker processes; results do not depend on it (default %(default)s)')
+    simulation_parser.add_argument('--timings', metavar='PATH', default=None, help='write stage times, counters and throughput to this json file')
+    simulation_parser.add_argument('--profile', action='store_true', help='run cProfile and add the slowest functions to the --timings report')
+
+    simulate_parser = subparsers.add_parser('simulate', parents=[simulation_parser], help='simulate games of one strategy')
+    simulate_parser.add_argument('--strategy', type=int, choices=[1, 2], default=2, help='1: roll a set number of times, 2: roll to a target turn score (default %(default)s)')
+    simulate_parser.set_defaults(run=run_simulate)
+
+    compare_parser = subparsers.add_parser('compare', parents=[simulation_parser], help='compare both strategies by simulation (t-test) and exactly')
+    compare_parser.add_argument('--alpha', type=float, default=0.05, help='significance level of the t-test (default %(default)s)')
+    compare_parser.set_defaults(run=run_compare)
+
+    plot_parser = subparsers.add_parser('plot', parents=[simulation_parser], help='save the four figures of the analysis')
+    plot_parser.add_argument('--output-dir', default='.', help='directory the figures are saved to (default: current directory)')
+    plot_parser.set_defaults(run=run_plot)
+
+    bootstrap_parser = subparsers.add_parser('bootstrap', help='confidence bands for every printed quantity, by resampling the roll log (exact formulas, no simulation)')
+    bootstrap_parser.add_argument('--roll-log', default=default_roll_log_path, help='roll log (.xlsx or .csv) to resample (default %(default)s)')
+    bootstrap_parser.add_argument('--cache-dir', default=default_roll_log_cache_dir, help='columnar cache of the roll log, shared with passing_pigs_v1.1.1.py (default %(default)s)')
+    bootstrap_parser.add_argument('--replicates', type=int, default=2000, help='resampled logs (default %(default)s)')
+    bootstrap_parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the bands (default %(default)s)')
+    bootstrap_parser.add_argument('--games', type=int, default=default_n_games, help='games per strategy behind the t-test p-value (default %(default)s)')
+    bootstrap_parser.add_argument('--target-game-score', type=float, default=default_target_game_score, help='points needed to finish a game (default %(default)s)')
+    bootstrap_parser.add_argument('--seed', type=int, default=default_seed, help='seed of the resampling (default %(default)s)')
+    bootstrap_parser.set_defaults(run=run_bootstrap)
+
+    optimal_parser = subparsers.add_parser('optimal', parents=[simulation_parser], help='solve the win-maximizing policy and check that it beats both strategies head to head')
+    optimal_parser.add_argument('--policy-dir', default=default_policy_dir, help='solved policies are cached here, one file per target game score (default %(default)s)')
+    optimal_parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the win rate intervals (default %(default)s)')
+    optimal_parser.set_defaults(run=run_optimal)
+
+    sweep_parser = subparsers.add_parser('sweep', help='exact win rates of every roll count and target turn score against one strategy, for target game scores from 50 to 500')
+    sweep_parser.add_argument('--opponent-strategy', type=int, choices=[1, 2], default=2, help='strategy the swept policies play against (default %(default)s)')
+    sweep_parser.add_argument('--output-dir', default=default_sweep_dir, help='the sweep is checkpointed here and resumed after an interruption (default %(default)s)')
+    sweep_parser.set_defaults(run=run_sweep)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'profile', False) and (args.timings is None):
+        parser.error('--profile adds to the --timings report, so it needs --timings PATH')
+    args.instrumentation = None
+    if getattr(args, 'timings', None) is None:
+        return args.run(args) or 0
+    from pass_the_pigs.instrumentation import Instrumentation
+    args.instrumentation = Instrumentation(profile=args.profile)
+    with args.instrumentation.stage(args.command):
+        status = args.run(args)
+    args.instrumentation.to_json(args.timings)
+    print( '\n'.join( args.instrumentation.summary_lines() ) )
+    return status or 0
@@ -0,0 +1,217 @@
+################################################################################
+##### description #####
+#exact distributions for fixed turn policies, computed on an integer grid of quarter points instead of by simulating games
+#every score in 'pass the pigs' is a multiple of 0.25, so a score of s points is stored at index 4*s of a probability array
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+################################################################################
+##### settings #####
+quarter_points_per_point = 4
+default_tolerance = 1e-13 #probability mass left over when a distribution is considered complete
+default_max_turns = 100000
+
+################################################################################
+##### convert points to quarter points #####
+def points_to_quarter_points(points):
+    quarter_points = np.asarray(points, dtype=float) * quarter_points_per_point
+    rounded_quarter_points = np.rint(quarter_points)
+    if not np.allclose(quarter_points, rounded_quarter_points):
+        raise ValueError('scores must be multiples of 0.25 points')
+    return rounded_quarter_points.astype(np.int64)
+
+#smallest whole number of quarter points that satisfies 'score >= threshold'
+def threshold_to_quarter_points(threshold):
+    return int(np.ceil(threshold * quarter_points_per_point - 1e-9))
+
+#the largest number of quarter points that every scoring roll is a multiple of (4, i.e. 1 point, for the standard scoring). counting scores
+#in these units instead of quarter points keeps the grids, markov chains and game states as small as possible
+def roll_score_unit(roll_pmf):
+    scoring_quarter_points = np.flatnonzero(roll_pmf[1:] > 0) + 1
+    if scoring_quarter_points.size == 0:
+        raise ValueError('every roll is a pig out')
+    return int(np.gcd.reduce(scoring_quarter_points))
+
+#smallest whole number of score units (from roll_score_unit) that satisfies 'score >= threshold'
+def threshold_to_units(threshold, score_unit):
+    return -(-threshold_to_quarter_points(threshold) // score_unit)
+
+################################################################################
+##### probability of scoring each number of quarter points in one roll #####
+#index 0 holds the probability of a pig out
+def roll_points_pmf(all_possible_scores_array, all_possible_score_probabilities_array):
+    return np.bincount(points_to_quarter_points(all_possible_scores_array), weights=np.asarray(all_possible_score_probabilities_array, dtype=float))
+
+#the same distribution with the pig out removed, so its total mass is P(no pig out). works on the last axis, like the functions below
+def no_pig_out_roll_pmf(roll_pmf):
+    no_pig_out_pmf = np.array(roll_pmf, dtype=float)
+    no_pig_out_pmf[..., 0] = 0.0
+    return no_pig_out_pmf
+
+#stacked distributions of different lengths (one per row) convolved along the last axis, one roll outcome at a time
+def convolve_pmfs(pmf_a, pmf_b):
+    if (np.ndim(pmf_a) == 1) and (np.ndim(pmf_b) == 1):
+        return np.convolve(pmf_a, pmf_b)
+    leading_shape = np.broadcast_shapes(np.shape(pmf_a)[:-1], np.shape(pmf_b)[:-1])
+    convolved = np.zeros(leading_shape + (np.shape(pmf_a)[-1] + np.shape(pmf_b)[-1] - 1,))
+    for shift in np.flatnonzero(np.any(np.reshape(pmf_b, (-1, np.shape(pmf_b)[-1])) != 0, axis=0)): #the roll outcomes that can happen at all
+        convolved[..., shift:shift+np.shape(pmf_a)[-1]] += pmf_a * pmf_b[..., shift:shift+1]
+    return convolved
+
+################################################################################
+##### probability of banking each number of quarter points in one turn #####
+#the turn continues while fewer than max_turn_rolls rolls have been made AND the turn score is below target_turn_grid_points, just like the game simulations
+#(None means no limit). roll_pmf is a roll distribution on a grid (quarter points, or any coarser unit), e.g. from roll_points_pmf
+#turn_pmf[q] is the probability of banking q grid points; turn_pmf[0] includes every turn that ended in a pig out
+def turn_pmf_on_grid(roll_pmf, max_turn_rolls=None, target_turn_grid_points=None, tolerance=default_tolerance):
+    pig_out_prob = roll_pmf[0]
+    no_pig_out_pmf = no_pig_out_roll_pmf(roll_pmf)
+    if pig_out_prob >= 1.0:
+        raise ValueError('every roll is a pig out')
+
+    still_rolling_pmf = np.ones(1) #distribution of the turn score over the turns that have not ended yet
+    turn_pmf = np.zeros(1)
+    n_rolls_this_turn = 0
+    while still_rolling_pmf.sum() > tolerance:
+        pig_out_mass = still_rolling_pmf.sum() * pig_out_prob #every turn still going can pig out on the next roll
+        still_rolling_pmf = np.convolve(still_rolling_pmf, no_pig_out_pmf) #the rest add the points from the roll
+        n_rolls_this_turn+=1
+        if len(turn_pmf) < len(still_rolling_pmf):
+            turn_pmf = np.concatenate((turn_pmf, np.zeros(len(still_rolling_pmf) - len(turn_pmf))))
+        turn_pmf[0] += pig_out_mass
+
+        if (max_turn_rolls is not None) and (n_rolls_this_turn >= max_turn_rolls): #out of rolls, so every remaining turn banks its score
+            turn_pmf[:len(still_rolling_pmf)] += still_rolling_pmf
+            break
+        if (target_turn_grid_points is not None) and (len(still_rolling_pmf) > target_turn_grid_points): #turns that reached the target turn score bank it
+            turn_pmf[target_turn_grid_points:len(still_rolling_pmf)] += still_rolling_pmf[target_turn_grid_points:]
+            still_rolling_pmf = still_rolling_pmf[:target_turn_grid_points]
+    return turn_pmf
+
+################################################################################
+##### turn distributions for a fixed number of rolls #####
+#points scored by n_rolls rolls in a row, over the roll sequences that never pigged out (total mass P(no pig out)**n_rolls)
+#the n-fold convolution is the n-th power of the roll distribution's fourier transform, so long turns cost one transform instead of n convolutions
+def n_roll_points_pmf(roll_pmf, n_rolls):
+    no_pig_out_pmf = no_pig_out_roll_pmf(roll_pmf)
+    n_points = n_rolls*(no_pig_out_pmf.shape[-1]-1) + 1
+    n_fft = 1 << int(np.ceil(np.log2(n_points)))
+    points_pmf = np.fft.irfft(np.fft.rfft(no_pig_out_pmf, n_fft, axis=-1)**n_rolls, n_fft, axis=-1)[..., :n_points]
+    points_pmf[points_pmf < 0] = 0.0 #round-off from the transform
+    return points_pmf
+
+#a turn that rolls a set number of times unless it pigs out first banks the points of its rolls; every other turn pigged out
+def roll_count_turn_pmf_from_points(points_pmf):
+    turn_pmf = np.array(points_pmf, dtype=float)
+    turn_pmf[..., 0] = np.maximum(1.0 - turn_pmf[..., 1:].sum(axis=-1), 0.0)
+    return turn_pmf
+
+################################################################################
+##### turn distributions for many target turn scores at once #####
+#below the target turn score every turn keeps rolling, so the expected number of times a turn passes through each score below the target
+#(visits[q] = [q == 0] + sum over rolls x of P(x) * visits[q - x]) is the same for every target. it is computed once up to the largest target,
+#and each target's turn distribution is one convolution of its share of the visits with the roll distribution
+def threshold_turn_pmfs_on_grid(roll_pmf, target_turn_grid_points_list):
+    visits = turn_score_visits_on_grid(roll_pmf, max(target_turn_grid_points_list))
+    return [threshold_turn_pmf_from_visits(roll_pmf, visits, target_turn_grid_points) for target_turn_grid_points in target_turn_grid_points_list]
+
+#visits to every turn score below n_scores. pass the visits computed earlier to extend them instead of starting over
+#roll_pmf may hold one roll distribution per row; the visits then have one row per roll distribution too
+def turn_score_visits_on_grid(roll_pmf, n_scores, visits=None):
+    roll_pmf = np.asarray(roll_pmf, dtype=float)
+    if visits is None:
+        visits = np.ones(roll_pmf.shape[:-1] + (1,))
+    n_known_scores = visits.shape[-1]
+    if n_scores <= n_known_scores:
+        return visits
+    visits = np.concatenate((visits, np.zeros(visits.shape[:-1] + (n_scores - n_known_scores,))), axis=-1)
+    for score in range(n_known_scores, n_scores):
+        n_steps = min(score, roll_pmf.shape[-1]-1)
+        visits[..., score] = np.einsum('...j,...j->...', roll_pmf[..., n_steps:0:-1], visits[..., score-n_steps:score]) #a roll of x points (never a pig out) from score - x
+    return visits
+
+#the visits to the turn scores a turn keeps rolling from, i.e. the scores below its target. their sum is the expected number of rolls per turn
+#target_turn_grid_points is one target, or one target per row of visits
+def visits_below_target(visits, target_turn_grid_points):
+    target_turn_grid_points = np.asarray(target_turn_grid_points)
+    if np.any(target_turn_grid_points <= 0):
+        raise ValueError('a turn must allow at least one roll')
+    if np.max(target_turn_grid_points) > visits.shape[-1]:
+        raise ValueError('visits only cover turn scores below {}'.format(visits.shape[-1]))
+    visits = visits[..., :np.max(target_turn_grid_points)]
+    return np.where(np.arange(visits.shape[-1]) < target_turn_grid_points[..., None], visits, 0.0)
+
+def threshold_turn_pmf_from_visits(roll_pmf, visits, target_turn_grid_points):
+    rolling_visits = visits_below_target(visits, target_turn_grid_points)
+    turn_pmf = convolve_pmfs(rolling_visits, no_pig_out_roll_pmf(roll_pmf))
+    turn_pmf = np.where(np.arange(turn_pmf.shape[-1]) < np.asarray(target_turn_grid_points)[..., None], 0.0, turn_pmf) #those scores keep rolling
+    turn_pmf[..., 0] = np.asarray(roll_pmf)[..., 0] * rolling_visits.sum(axis=-1) #pig outs from every score below the target
+    return turn_pmf
+
+################################################################################
+##### probability of needing each number of turns to reach the target game score #####
+#the game score is a markov chain over quarter-point scores below the target. each turn adds points drawn from turn_pmf no matter what the score is,
+#so the transition matrix is a banded toeplitz matrix and one step of the chain is a convolution truncated at the target game score
+#turns_pmf[k] is the probability that the target game score is reached on turn k
+def turns_to_target_pmf(turn_pmf, target_game_score, tolerance=default_tolerance, max_turns=default_max_turns):
+    return turns_to_targets_pmfs_on_grid(turn_pmf, [threshold_to_quarter_points(target_game_score)], tolerance=tolerance, max_turns=max_turns)[0]
+
+#every target game score in one pass: the chain is run up to the largest target, and the game has not reached target t after k turns
+#exactly when its score is still below t, so each target's distribution is read off the cumulative distribution of the game score
+#returns an array with one row per target; row i, column k is the probability of reaching target i on turn k
+def turns_to_targets_pmfs_on_grid(turn_pmf, target_game_grid_points_list, tolerance=default_tolerance, max_turns=default_max_turns):
+    turn_pmf = np.asarray(turn_pmf, dtype=float)
+    if turn_pmf[1:].sum() <= 0:
+        raise ValueError('no turn ever banks points, so the target game score is never reached')
+    target_game_grid_points_list = np.maximum(np.asarray(target_game_grid_points_list, dtype=np.int64), 1)
+    max_target = int(target_game_grid_points_list.max())
+    if len(turn_pmf) > max_target + 1: #every score past the largest target ends the game the same way
+        turn_pmf = np.concatenate((turn_pmf[:max_target], [turn_pmf[max_target:].sum()]))
+    game_score_pmf = np.zeros(max_target) #distribution of the game score over the games that have not reached the largest target yet
+    game_score_pmf[0] = 1.0
+    prob_not_reached = [np.cumsum(game_score_pmf)[target_game_grid_points_list-1]] #after 0 turns
+    while game_score_pmf.sum() > tolerance:
+        if len(prob_not_reached) > max_turns:
+            raise RuntimeError('the turns-to-target distribution did not converge within {} turns'.format(max_turns))
+        game_score_pmf = np.convolve(game_score_pmf, turn_pmf)[:max_target]
+        prob_not_reached.append( np.cumsum(game_score_pmf)[target_game_grid_points_list-1] )
+    prob_not_reached = np.asarray(prob_not_reached).T
+    turns_pmfs = np.zeros(prob_not_reached.shape)
+    turns_pmfs[:, 1:] = prob_not_reached[:, :-1] - prob_not_reached[:, 1:] #games that reached the target on this turn
+    return turns_pmfs
+
+################################################################################
+##### summary statistics of a turns-to-target distribution #####
+def turns_pmf_mean(turns_pmf):
+    return float(np.sum(np.arange(len(turns_pmf)) * turns_pmf))
+
+#mean and standard deviation of stacked distributions (one per row) over values
+def stacked_pmf_moments(pmfs, values):
+    mean = pmfs @ values
+    std = np.sqrt(np.maximum(pmfs @ values**2 - mean**2, 0.0))
+    return mean, std
+
+################################################################################
+##### exact comparison of two turns-to-target distributions #####
+#the two players are independent, so the joint distribution of their turn counts is the outer product of the two distributions
+#turns_pmfs_a and turns_pmfs_b may hold one distribution per row (of any length); returns P(turns_a < turns_b) and P(turns_a == turns_b) for every row
+def stacked_turns_comparison(turns_pmfs_a, turns_pmfs_b):
+    n_turns = max(turns_pmfs_a.shape[-1], turns_pmfs_b.shape[-1])
+    turns_pmfs_a = np.pad(turns_pmfs_a, [(0, 0)]*(turns_pmfs_a.ndim-1) + [(0, n_turns - turns_pmfs_a.shape[-1])])
+    turns_pmfs_b = np.pad(turns_pmfs_b, [(0, 0)]*(turns_pmfs_b.ndim-1) + [(0, n_turns - turns_pmfs_b.shape[-1])])
+    prob_a_fewer_turns = np.sum(turns_pmfs_a * (1.0 - np.cumsum(turns_pmfs_b, axis=-1)), axis=-1)
+    prob_same_turns = np.sum(turns_pmfs_a * turns_pmfs_b, axis=-1)
+    return prob_a_fewer_turns, prob_same_turns
+
+def compare_turns_to_target(turns_pmf_a, turns_pmf_b):
+    prob_a_fewer_turns, prob_same_turns = stacked_turns_comparison(np.asarray(turns_pmf_a), np.asarray(turns_pmf_b))
+    comparison = {}
+    comparison['mean_turns_a'] = turns_pmf_mean(turns_pmf_a)
+    comparison['mean_turns_b'] = turns_pmf_mean(turns_pmf_b)
+    comparison['mean_difference'] = comparison['mean_turns_a'] - comparison['mean_turns_b']
+    comparison['prob_a_fewer_turns'] = float(prob_a_fewer_turns) #P(turns_a < turns_b)
+    comparison['prob_same_turns'] = float(prob_same_turns)
+    comparison['prob_b_fewer_turns'] = 1.0 - comparison['prob_a_fewer_turns'] - comparison['prob_same_turns']
+    return comparison
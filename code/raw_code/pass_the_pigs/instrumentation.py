@@ -0,0 +1,114 @@
+################################################################################
+##### description #####
+#lightweight instrumentation for the analysis pipeline: named stage timers, counters (rolls, turns, games, ...) and an optional cProfile hook
+#a stage is timed either as a with-block, or from start_stage(name) until the next stage starts (handy in a flat script). stages do not nest
+#counts are also kept per stage, so the throughput of a stage (rolls per second while simulating, ...) is not diluted by the stages around it
+#the report is a plain dictionary that is written out as json
+
+################################################################################
+##### import packages #####
+import json
+import time
+from contextlib import contextmanager
+
+################################################################################
+##### settings #####
+default_n_profile_entries = 25 #functions listed in the report when profiling, by cumulative time
+
+################################################################################
+##### pipeline instrumentation #####
+#profile=True runs cProfile while any stage is timed; pass profile_path to also keep the raw profile (for snakeviz, pstats, ...)
+class Instrumentation:
+    def __init__(self, profile=False, profile_path=None):
+        self.stage_seconds = {} #name -> total wall time, in the order the stages first ran
+        self.stage_calls = {}
+        self.counters = {}
+        self.stage_counters = {} #name -> {counter: n}
+        self.current_stage = None
+        self.current_stage_start = None
+        self.created = time.perf_counter()
+        self.profile_path = profile_path
+        self.profiler = None
+        if profile:
+            import cProfile #only needed when profiling
+            self.profiler = cProfile.Profile()
+
+    ##### stage timers #####
+    def start_stage(self, name):
+        self.end_stage()
+        self.current_stage = name
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.current_stage_start = time.perf_counter()
+
+    def end_stage(self):
+        if self.current_stage is None:
+            return
+        elapsed = time.perf_counter() - self.current_stage_start
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.stage_seconds[self.current_stage] = self.stage_seconds.get(self.current_stage, 0.0) + elapsed
+        self.stage_calls[self.current_stage] = self.stage_calls.get(self.current_stage, 0) + 1
+        self.current_stage = None
+
+    @contextmanager
+    def stage(self, name):
+        self.start_stage(name)
+        try:
+            yield self
+        finally:
+            self.end_stage()
+
+    ##### counters #####
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+        if self.current_stage is not None:
+            stage_counters = self.stage_counters.setdefault(self.current_stage, {})
+            stage_counters[name] = stage_counters.get(name, 0) + int(n)
+
+    ##### report #####
+    def report(self, n_profile_entries=default_n_profile_entries):
+        self.end_stage()
+        report = {}
+        report['total_seconds'] = time.perf_counter() - self.created
+        report['stages'] = []
+        for name, seconds in self.stage_seconds.items():
+            stage_counters = self.stage_counters.get(name, {})
+            stage = {'name': name, 'seconds': seconds, 'calls': self.stage_calls[name], 'counters': dict(stage_counters)}
+            stage['throughput'] = {counter + '_per_second': n / seconds for counter, n in stage_counters.items()} if seconds > 0 else {}
+            report['stages'].append(stage)
+        report['counters'] = dict(self.counters)
+        timed_seconds = sum(self.stage_seconds.values())
+        report['throughput'] = {counter + '_per_second': n / timed_seconds for counter, n in self.counters.items()} if timed_seconds > 0 else {}
+        if self.profiler is not None:
+            report['profile'] = self.profile_entries(n_profile_entries)
+            if self.profile_path is not None:
+                self.profiler.dump_stats(self.profile_path)
+        return report
+
+    #the functions with the largest cumulative time over all timed stages
+    def profile_entries(self, n_entries):
+        import pstats
+        stats = pstats.Stats(self.profiler)
+        entries = []
+        for (file_name, line_number, function_name), (primitive_calls, n_calls, own_seconds, cumulative_seconds, callers) in stats.stats.items():
+            entries.append({'function': '{}:{}({})'.format(file_name, line_number, function_name), 'calls': n_calls, 'own_seconds': own_seconds, 'cumulative_seconds': cumulative_seconds})
+        entries.sort(key=lambda entry: entry['cumulative_seconds'], reverse=True)
+        return entries[:n_entries]
+
+    #writes the report as json to path, or returns it as a string when path is None
+    def to_json(self, path=None):
+        report_json = json.dumps(self.report(), indent=1)
+        if path is None:
+            return report_json
+        with open(path, 'w') as report_file:
+            report_file.write(report_json + '\n')
+
+    #one line per stage, with the throughput of whatever was counted during it, for printing at the end of a run
+    def summary_lines(self):
+        self.end_stage()
+        lines = []
+        for name, seconds in self.stage_seconds.items():
+            rates = ['{:0.0f} {}/s'.format(n / seconds, counter) for counter, n in self.stage_counters.get(name, {}).items() if seconds > 0]
+            lines.append('  {}: {:0.3f} s'.format(name, seconds) + (' ({})'.format(', '.join(rates)) if rates else ''))
+        return lines
@@ -0,0 +1,21 @@
+################################################################################
+##### description #####
+#confidence intervals for observed proportions: orientation probabilities estimated from the roll log, and win rates from tournaments
+
+################################################################################
+##### import packages #####
+from statistics import NormalDist
+
+import numpy as np
+
+################################################################################
+##### wilson score interval #####
+#n_successes out of n_trials, elementwise for arrays of counts. stays inside [0, 1] and is sensible for rare outcomes and small samples,
+#unlike the normal approximation. n_trials = 0 is treated as 1 trial, so empty counts give the interval of a proportion of 0
+def wilson_interval(n_successes, n_trials, confidence=0.95):
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+    n_trials = np.maximum(np.asarray(n_trials, dtype=float), 1)
+    proportion = np.asarray(n_successes, dtype=float) / n_trials
+    center = (proportion + z**2/(2*n_trials)) / (1 + z**2/n_trials)
+    half_width = z * np.sqrt(proportion*(1-proportion)/n_trials + z**2/(4*n_trials**2)) / (1 + z**2/n_trials)
+    return np.clip(center - half_width, 0.0, 1.0), np.clip(center + half_width, 0.0, 1.0)
@@ -0,0 +1,86 @@
+################################################################################
+##### description #####
+#the probability model of a single roll and the expected-score formulas behind the two turn strategies, in plain python
+#nothing here imports numpy, so quick questions like 'what is the expected score of one roll?' start in a few milliseconds.
+#outcome_table.py builds the same model as numpy arrays for the simulators and the exact solvers
+
+################################################################################
+##### default pig orientation probabilities and scores #####
+#probabilities estimated from pig_outcomes_per_roll.xlsx, scores from the 'pass the pigs' instruction booklet
+default_per_pig_per_roll_probs = {}
+default_per_pig_per_roll_probs['spot_side_up'] = 0.240
+default_per_pig_per_roll_probs['spot_side_down'] = 0.365
+default_per_pig_per_roll_probs['trotter'] = 0.058
+default_per_pig_per_roll_probs['razorback'] = 0.320
+default_per_pig_per_roll_probs['snouter'] = 0.017
+default_per_pig_per_roll_probs['leaning_jowler'] = 0.0
+default_per_pig_per_roll_probs['oinker'] = 0.0
+default_per_pig_per_roll_probs['piggy_back'] = 0.0
+
+default_per_roll_points = {}
+default_per_roll_points['sider'] = 0.25
+default_per_roll_points['pig_out'] = 0.0
+default_per_roll_points['trotter'] = 5.0
+default_per_roll_points['razorback'] = 5.0
+default_per_roll_points['snouter'] = 10.0
+default_per_roll_points['leaning_jowler'] = 15.0
+default_per_roll_points['oinker'] = 0.0
+default_per_roll_points['piggy_back'] = 0.0
+default_per_roll_points['combo_multiplier'] = 2.0
+
+################################################################################
+##### score of one roll of both pigs #####
+#same rules as the outcome table: two pigs on the same side score a double sider, two pigs on different sides pig out,
+#a pig on its side adds nothing to the other pig's score, and two pigs in the same (non-side) orientation score double
+def roll_score(orientation_a, orientation_b, per_roll_points):
+    a_is_sider = orientation_a[0:9] == 'spot_side'
+    b_is_sider = orientation_b[0:9] == 'spot_side'
+    if a_is_sider and b_is_sider:
+        if orientation_a == orientation_b:
+            return ( per_roll_points['sider'] + per_roll_points['sider'] ) * per_roll_points['combo_multiplier']
+        return per_roll_points['pig_out']
+    summed_points = (0.0 if a_is_sider else per_roll_points[orientation_a]) + (0.0 if b_is_sider else per_roll_points[orientation_b])
+    if orientation_a == orientation_b:
+        return summed_points * per_roll_points['combo_multiplier']
+    return summed_points
+
+##### probability of each distinct score from one roll, as a {score: probability} dictionary sorted by score. a score of 0 is a pig out #####
+def roll_score_probabilities(per_pig_per_roll_probs=None, per_roll_points=None):
+    if per_pig_per_roll_probs is None:
+        per_pig_per_roll_probs = default_per_pig_per_roll_probs
+    if per_roll_points is None:
+        per_roll_points = default_per_roll_points
+    score_probabilities = {}
+    for orientation_a, prob_a in per_pig_per_roll_probs.items():
+        for orientation_b, prob_b in per_pig_per_roll_probs.items():
+            score = roll_score(orientation_a, orientation_b, per_roll_points)
+            score_probabilities[score] = score_probabilities.get(score, 0.0) + prob_a*prob_b
+    return dict(sorted(score_probabilities.items()))
+
+################################################################################
+##### expected score formulas #####
+#strategy 1: expected score for a turn of num_rolls rolls in a row (eq. 4)
+def strategy_1_score(num_rolls, expected_score_no_pig_out, prob_no_pig_out_one_roll):
+    score = expected_score_no_pig_out * num_rolls * (prob_no_pig_out_one_roll**num_rolls)
+    return score
+
+#strategy 2: expected score after one more roll, given the current score for the turn (eq. 7)
+def strategy_2_score(current_score, expected_score_no_pig_out, prob_no_pig_out_one_roll):
+    score = (current_score + expected_score_no_pig_out) * prob_no_pig_out_one_roll
+    return score
+
+################################################################################
+##### expected score of one roll and the turn targets of both strategies #####
+#returns a dictionary with the numbers that passing_pigs_v1.1.1.py prints before it simulates any games
+def expected_scores(per_pig_per_roll_probs=None, per_roll_points=None):
+    score_probabilities = roll_score_probabilities(per_pig_per_roll_probs, per_roll_points)
+    expected = {}
+    expected['P_pig_out'] = sum(prob for score, prob in score_probabilities.items() if score <= 0)
+    expected['P_not_pig_out'] = 1.0 - expected['P_pig_out']
+    expected['one_roll_expected_score'] = sum(score*prob for score, prob in score_probabilities.items())
+    expected['one_roll_expected_score_no_pig_out'] = expected['one_roll_expected_score'] / expected['P_not_pig_out']
+    expected['strategy_1_target_rolls'] = expected['P_not_pig_out'] / expected['P_pig_out'] #where d(eq. 4)/d(num_rolls) = 0
+    expected['strategy_1_avg_score'] = expected['strategy_1_target_rolls'] * expected['one_roll_expected_score_no_pig_out']
+    expected['strategy_2_target_score'] = (expected['one_roll_expected_score_no_pig_out'] * expected['P_not_pig_out']) / expected['P_pig_out'] #where eq. 7 = current score
+    expected['strategy_2_avg_rolls'] = expected['strategy_2_target_score'] / expected['one_roll_expected_score_no_pig_out']
+    return expected
@@ -0,0 +1,117 @@
+################################################################################
+##### description #####
+#win-probability-maximizing hold/roll policy for a 2-player race to the target game score, found by value iteration
+#unlike strategy 1 and strategy 2, the decision depends on the whole game state: my score, my opponent's score and my score for the current turn
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+from pass_the_pigs.exact import points_to_quarter_points, roll_points_pmf, roll_score_unit, threshold_to_units
+from pass_the_pigs.intervals import wilson_interval
+from pass_the_pigs.policy_kernel import limits_roll_table, optimal_against_tables_roll_again, play_policy_games, stack_roll_tables
+
+################################################################################
+##### settings #####
+default_tolerance = 1e-9 #largest change in any win probability between sweeps once the values have converged
+default_max_iterations = 10000
+default_games_per_opponent = 10000
+
+################################################################################
+##### solve for the optimal policy #####
+#scores are counted in units of the largest step that divides every roll score (1 point for the standard scoring), so a race to 100 has 100x100x100 states
+#a state (i, j, t) means the player about to act has banked i units, the opponent has banked j, and the player would have t = i + turn score if they held now
+#storing the would-be total t instead of the turn score turns every roll into a step up in t, and every total at or beyond the target is a win
+#each sweep updates the states from the highest total down (gauss-seidel order), so a whole chain of rolls is resolved in one sweep and only the
+#hand-offs to the opponent after a hold or a pig out need repeated sweeps. every step of a sweep is a vectorized bellman update over all (i, j)
+def solve_optimal_policy(all_possible_scores_array, all_possible_score_probabilities_array, target_game_score=100, tolerance=default_tolerance, max_iterations=default_max_iterations):
+    roll_pmf = roll_points_pmf(all_possible_scores_array, all_possible_score_probabilities_array)
+    score_unit = roll_score_unit(roll_pmf) #compact state encoding: count scores in the largest unit every roll is a multiple of
+    roll_quarter_points = np.flatnonzero(roll_pmf[1:] > 0) + 1 #scores of the rolls that are not a pig out
+    n_scores = threshold_to_units(target_game_score, score_unit) #scores below the target, in units
+    roll_units = roll_quarter_points // score_unit
+    roll_probs = roll_pmf[roll_quarter_points]
+    pig_out_prob = roll_pmf[0]
+
+    win_probability = np.ones((n_scores + roll_units.max(), n_scores, n_scores)) #indexed [t, i, j]. totals at or beyond the target are wins, so those rows stay at 1
+    win_probability[:n_scores] = 0.5
+    start_of_turn_win_probability = np.full((n_scores, n_scores), 0.5) #[a, b] -> win probability at the start of a turn with a banked against b, i.e. the state (a, b, a)
+    roll_decision = np.zeros((n_scores, n_scores, n_scores), dtype=bool) #indexed [t, i, j] while solving
+    n_iterations = 0
+    converged = False
+    while (n_iterations < max_iterations) and (not converged):
+        max_change = 0.0
+        pig_out_value = pig_out_prob * (1.0 - start_of_turn_win_probability.T) #after a pig out at (i, j) the opponent starts a turn at (j, i)
+        for total in range(n_scores-1, -1, -1):
+            roll_value = pig_out_value + np.tensordot(roll_probs, win_probability[total + roll_units], axes=1)
+            hold_value = 1.0 - start_of_turn_win_probability[:, total] #after holding at this total the opponent starts a turn at (j, total)
+            roll_decision[total] = roll_value >= hold_value[None, :]
+            roll_decision[total, total:] = True #a turn score of zero (and the unused states with i > t) means the player has to roll
+            new_win_probability = np.where(roll_decision[total], roll_value, hold_value[None, :])
+            max_change = max(max_change, np.max(np.abs(new_win_probability - win_probability[total])))
+            win_probability[total] = new_win_probability
+            start_of_turn_win_probability[total, :] = new_win_probability[total, :]
+        n_iterations+=1
+        converged = max_change < tolerance
+    if not converged:
+        raise RuntimeError('value iteration did not converge within {} iterations'.format(max_iterations))
+
+    policy = {}
+    policy['target_game_score'] = float(target_game_score)
+    policy['score_unit'] = score_unit / 4.0 #points per unit
+    policy['roll'] = np.ascontiguousarray(roll_decision.transpose(1, 2, 0)) #[i, j, t] -> True where rolling again is at least as good as holding
+    policy['win_probability'] = np.ascontiguousarray(win_probability[:n_scores].transpose(1, 2, 0)) #[i, j, t]
+    policy['n_iterations'] = n_iterations
+    return policy
+
+################################################################################
+##### look up a decision in a solved policy #####
+#returns True if the player should roll again
+def should_roll(policy, my_game_score, opponent_game_score, turn_score):
+    n_scores = policy['roll'].shape[0]
+    units = points_to_quarter_points([my_game_score, opponent_game_score, my_game_score + turn_score]) / (4.0 * policy['score_unit'])
+    my_units, opponent_units, total_units = np.floor(units).astype(np.int64)
+    if total_units >= n_scores: #holding wins the game
+        return False
+    return bool(policy['roll'][my_units, min(opponent_units, n_scores-1), total_units])
+
+################################################################################
+##### save and load a solved policy #####
+#the roll decisions are stored as packed bits and the win probabilities as float32, so a race to 100 takes a few MB on disk
+def save_policy(path, policy):
+    np.savez_compressed(path, target_game_score=policy['target_game_score'], score_unit=policy['score_unit'], n_iterations=policy['n_iterations'], roll_shape=np.asarray(policy['roll'].shape), roll_bits=np.packbits(policy['roll'], axis=None), win_probability=policy['win_probability'].astype(np.float32))
+
+def load_policy(path):
+    with np.load(path) as saved:
+        roll_shape = tuple(saved['roll_shape'])
+        policy = {}
+        policy['target_game_score'] = float(saved['target_game_score'])
+        policy['score_unit'] = float(saved['score_unit'])
+        policy['roll'] = np.unpackbits(saved['roll_bits'], count=int(np.prod(roll_shape))).astype(bool).reshape(roll_shape)
+        policy['win_probability'] = saved['win_probability'].astype(float)
+        policy['n_iterations'] = int(saved['n_iterations'])
+    return policy
+
+################################################################################
+##### head-to-head games against fixed turn policies #####
+#the solved policy plays games_per_opponent 2-player games against each opponent policy (target_turn_rolls, target_turn_score), moving first in
+#half of them, through policy_kernel.play_policy_games. games that nobody won within the kernel's turn limit count as losses
+#returns a dictionary of arrays with one entry per opponent: games, wins and the win rate of the solved policy with its wilson confidence interval
+def play_optimal_policy_head_to_head(outcome_table, policy, opponent_policies, games_per_opponent=default_games_per_opponent, seed=None, confidence=0.95):
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    n_games = np.zeros(len(opponent_policies), dtype=np.int64)
+    n_wins = np.zeros(len(opponent_policies), dtype=np.int64)
+    for opponent_index, (opponent_policy, opponent_seed_sequence) in enumerate(zip(opponent_policies, seed_sequence.spawn(len(opponent_policies)))):
+        roll_tables = stack_roll_tables([limits_roll_table(*opponent_policy, score_unit=policy['score_unit'])])
+        for optimal_seat, seat_seed_sequence in enumerate(opponent_seed_sequence.spawn(2)):
+            results = play_policy_games(outcome_table, optimal_against_tables_roll_again, (optimal_seat, policy['roll'], roll_tables), games_per_opponent//2 + optimal_seat*(games_per_opponent % 2), n_players=2, target_game_score=policy['target_game_score'], seed=seat_seed_sequence)
+            if results['score_unit'] != policy['score_unit']:
+                raise ValueError('the policy was solved for rolls scored in steps of {} points, not {}'.format(policy['score_unit'], results['score_unit']))
+            n_games[opponent_index] += len(results['winner_seat'])
+            n_wins[opponent_index] += np.count_nonzero(results['winner_seat'] == optimal_seat)
+    head_to_head = {}
+    head_to_head['games'] = n_games
+    head_to_head['wins'] = n_wins
+    head_to_head['win_rate'] = n_wins / np.maximum(n_games, 1)
+    head_to_head['win_rate_lower'], head_to_head['win_rate_upper'] = wilson_interval(n_wins, n_games, confidence)
+    return head_to_head
@@ -0,0 +1,146 @@
+################################################################################
+##### description #####
+#table of every score a single roll of both pigs can produce, built from a probability and a score dictionary
+#tables are memoized by a hash of the two dictionaries, so sweeps over many probability variants only build each variant once
+
+################################################################################
+##### import packages #####
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from pass_the_pigs.atomic_files import atomic_path
+from pass_the_pigs.model import default_per_pig_per_roll_probs, default_per_roll_points
+
+################################################################################
+##### settings #####
+probability_sum_tolerance = 1e-6 #how far the orientation probabilities may add up from 1
+outcome_table_cache_size = 1024 #tables kept in memory; the least recently used table is dropped first
+
+################################################################################
+##### roll outcome table #####
+#joint_scores/joint_probabilities hold every (pig A, pig B) pair in the same order as the original double loop over the probability dictionary
+#all_possible_scores_array holds each distinct score once, sorted, with its total probability. a score of 0 is a pig out
+class RollOutcomeTable:
+    def __init__(self, per_pig_per_roll_probs, per_roll_points):
+        self.orientations = list(per_pig_per_roll_probs)
+        self.per_pig_probs = np.asarray([per_pig_per_roll_probs[orientation] for orientation in self.orientations], dtype=float)
+        if abs(self.per_pig_probs.sum() - 1.0) > probability_sum_tolerance:
+            raise ValueError('pig orientation probabilities add up to {:0.6f}, not 1'.format(self.per_pig_probs.sum()))
+        if np.any(self.per_pig_probs < 0):
+            raise ValueError('pig orientation probabilities cannot be negative')
+
+        #score every pair of orientations at once: rows are pig A, columns are pig B
+        is_sider = np.asarray([orientation[0:9] == 'spot_side' for orientation in self.orientations]) #pig landed on its side
+        per_pig_points = np.asarray([0.0 if sider else per_roll_points[orientation] for orientation, sider in zip(self.orientations, is_sider)]) #a pig on its side contributes 0 points unless both are
+        same_orientation = np.eye(len(self.orientations), dtype=bool)
+        both_siders = is_sider[:, None] & is_sider[None, :]
+        summed_points = per_pig_points[:, None] + per_pig_points[None, :]
+        double_sider_points = ( per_roll_points['sider'] + per_roll_points['sider'] ) * per_roll_points['combo_multiplier']
+        sider_pair_points = np.where(same_orientation, double_sider_points, per_roll_points['pig_out']) #same side up scores, different sides up is a pig out
+        other_pair_points = np.where(same_orientation, summed_points * per_roll_points['combo_multiplier'], summed_points) #matching non-side orientations score double
+        joint_scores = np.where(both_siders, sider_pair_points, other_pair_points)
+        joint_probabilities = np.outer(self.per_pig_probs, self.per_pig_probs)
+        self.joint_scores = joint_scores.ravel()
+        self.joint_probabilities = joint_probabilities.ravel()
+
+        #collapse the pairs onto their distinct scores
+        self.all_possible_scores_array, score_index = np.unique(self.joint_scores, return_inverse=True)
+        self.all_possible_score_probabilities_array = np.bincount(score_index.ravel(), weights=self.joint_probabilities, minlength=len(self.all_possible_scores_array))
+        self.all_possible_score_cumulative_probabilities_array = np.cumsum(self.all_possible_score_probabilities_array)
+
+        #summary numbers used throughout the analysis
+        self.one_roll_expected_score = float(np.dot(self.joint_scores, self.joint_probabilities))
+        self.P_pig_out = float(self.all_possible_score_probabilities_array[self.all_possible_scores_array <= 0].sum()) #probability of 'pigging out' on one roll
+        self.P_not_pig_out = 1.0 - self.P_pig_out
+        self.one_roll_expected_score_no_pig_out = self.one_roll_expected_score / self.P_not_pig_out
+
+        self.alias_probabilities, self.alias_indices = build_alias_tables(self.all_possible_score_probabilities_array)
+
+    ##### draw roll scores with the alias method: one random outcome and one random number per roll, no search #####
+    def sample_roll_scores(self, rng, n_rolls):
+        outcome_index = rng.integers(len(self.alias_probabilities), size=n_rolls)
+        keep_outcome = rng.random(n_rolls) < self.alias_probabilities[outcome_index]
+        return self.all_possible_scores_array[np.where(keep_outcome, outcome_index, self.alias_indices[outcome_index])]
+
+################################################################################
+##### alias tables for sampling from a discrete distribution (vose's method) #####
+def build_alias_tables(probabilities):
+    n_outcomes = len(probabilities)
+    scaled_probabilities = np.asarray(probabilities, dtype=float) * n_outcomes / np.sum(probabilities)
+    alias_probabilities = np.ones(n_outcomes)
+    alias_indices = np.arange(n_outcomes)
+    small = [i for i in range(n_outcomes) if scaled_probabilities[i] < 1.0]
+    large = [i for i in range(n_outcomes) if scaled_probabilities[i] >= 1.0]
+    while small and large:
+        small_index = small.pop()
+        large_index = large.pop()
+        alias_probabilities[small_index] = scaled_probabilities[small_index]
+        alias_indices[small_index] = large_index
+        scaled_probabilities[large_index] -= 1.0 - scaled_probabilities[small_index] #the large outcome fills the rest of the small outcome's column
+        if scaled_probabilities[large_index] < 1.0:
+            small.append(large_index)
+        else:
+            large.append(large_index)
+    return alias_probabilities, alias_indices #whatever is left over is 1 up to rounding error and keeps alias_probabilities = 1
+
+################################################################################
+##### build a roll outcome table, reusing one built earlier from the same dictionaries #####
+#the last outcome_table_cache_size tables live in memory. pass cache_dir to also keep them on disk between sessions
+#(building a table takes well under a millisecond, so the disk cache mostly matters when the tables are shared between processes)
+outcome_table_cache = OrderedDict()
+
+def clear_outcome_table_cache():
+    outcome_table_cache.clear()
+
+def outcome_table_cache_key(per_pig_per_roll_probs, per_roll_points):
+    model_inputs = json.dumps( [list(per_pig_per_roll_probs.items()), sorted(per_roll_points.items())] ) #orientation order is kept because it sets the order of the joint arrays
+    return hashlib.sha256(model_inputs.encode('utf-8')).hexdigest()
+
+def build_roll_outcome_table(per_pig_per_roll_probs=None, per_roll_points=None, cache_dir=None):
+    if per_pig_per_roll_probs is None:
+        per_pig_per_roll_probs = default_per_pig_per_roll_probs
+    if per_roll_points is None:
+        per_roll_points = default_per_roll_points
+    cache_key = outcome_table_cache_key(per_pig_per_roll_probs, per_roll_points)
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, cache_key + '.npz')
+    if cache_key in outcome_table_cache:
+        outcome_table_cache.move_to_end(cache_key)
+        if (cache_path is not None) and not os.path.exists(cache_path): #the table was built in memory before cache_dir was given
+            save_roll_outcome_table(cache_path, outcome_table_cache[cache_key])
+        return outcome_table_cache[cache_key]
+
+    if (cache_path is not None) and os.path.exists(cache_path):
+        outcome_table = load_roll_outcome_table(cache_path)
+    else:
+        outcome_table = RollOutcomeTable(per_pig_per_roll_probs, per_roll_points)
+        if cache_path is not None:
+            save_roll_outcome_table(cache_path, outcome_table)
+    outcome_table_cache[cache_key] = outcome_table
+    while len(outcome_table_cache) > outcome_table_cache_size:
+        outcome_table_cache.popitem(last=False)
+    return outcome_table
+
+################################################################################
+##### save and load roll outcome tables #####
+saved_array_attributes = ['per_pig_probs', 'joint_scores', 'joint_probabilities', 'all_possible_scores_array', 'all_possible_score_probabilities_array', 'all_possible_score_cumulative_probabilities_array', 'alias_probabilities', 'alias_indices']
+saved_number_attributes = ['one_roll_expected_score', 'P_pig_out', 'P_not_pig_out', 'one_roll_expected_score_no_pig_out']
+
+def save_roll_outcome_table(path, outcome_table):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    saved_values = {attribute: getattr(outcome_table, attribute) for attribute in saved_array_attributes + saved_number_attributes}
+    with atomic_path(path) as temporary_path: #another process never sees a half-written table
+        np.savez(temporary_path, orientations=np.asarray(outcome_table.orientations), **saved_values)
+
+def load_roll_outcome_table(path):
+    outcome_table = RollOutcomeTable.__new__(RollOutcomeTable)
+    with np.load(path) as saved:
+        outcome_table.orientations = [str(orientation) for orientation in saved['orientations']]
+        for attribute in saved_array_attributes:
+            setattr(outcome_table, attribute, saved[attribute])
+        for attribute in saved_number_attributes:
+            setattr(outcome_table, attribute, float(saved[attribute]))
+    return outcome_table
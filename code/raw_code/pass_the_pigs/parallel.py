@@ -0,0 +1,93 @@
+################################################################################
+##### description #####
+#multi-core runner for the batch game simulator
+#the game budget is cut into fixed-size chunks and every chunk gets its own random stream spawned from one np.random.SeedSequence,
+#so the merged results for a given seed are bit-identical no matter how many worker processes share the chunks
+
+################################################################################
+##### import packages #####
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from pass_the_pigs.simulation import check_scoring_outcomes, check_turn_policy, simulate_games_batch
+
+################################################################################
+##### settings #####
+default_games_per_chunk = 100000 #small enough that a chunk's arrays stay well under 100 MB, large enough to keep every worker busy
+max_chunks_in_flight_per_worker = 2 #limits how many finished-but-unclaimed chunks can pile up in memory
+
+################################################################################
+##### simulate one chunk of games #####
+#module-level so that it can be sent to worker processes
+def simulate_game_chunk(chunk_index, n_games, seed_sequence, simulation_settings):
+    rng = np.random.default_rng(seed_sequence)
+    outcome = simulate_games_batch(n_games, rng=rng, **simulation_settings)
+    return chunk_index, outcome
+
+################################################################################
+##### stream chunks of simulated games as they finish #####
+#yields (first_game_index, outcome) pairs in whatever order the chunks complete. outcome has the same keys as simulate_games_batch
+def iter_simulated_game_chunks(n_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=np.inf, target_turn_score=np.inf, seed=None, n_workers=None, games_per_chunk=default_games_per_chunk, stop_at_target_game_score=False, record_turns=False):
+    check_turn_policy(target_turn_rolls, target_turn_score, stop_at_target_game_score) #before any worker starts a chunk that would never finish
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    chunk_starts = np.arange(0, n_games, games_per_chunk)
+    chunk_sizes = np.minimum(games_per_chunk, n_games - chunk_starts)
+    chunk_seed_sequences = seed_sequence.spawn(len(chunk_starts)) #one independent stream per chunk, independent of the number of workers
+
+    simulation_settings = {}
+    simulation_settings['target_game_score'] = target_game_score
+    simulation_settings['all_possible_scores_array'] = np.asarray(all_possible_scores_array, dtype=float)
+    simulation_settings['all_possible_score_cumulative_probabilities_array'] = np.asarray(all_possible_score_cumulative_probabilities_array, dtype=float)
+    simulation_settings['target_turn_rolls'] = target_turn_rolls
+    simulation_settings['target_turn_score'] = target_turn_score
+    simulation_settings['stop_at_target_game_score'] = stop_at_target_game_score
+    simulation_settings['record_turns'] = record_turns
+
+    if n_workers <= 1: #no need for a process pool
+        for chunk_index in range(len(chunk_starts)):
+            outcome = simulate_game_chunk(chunk_index, int(chunk_sizes[chunk_index]), chunk_seed_sequences[chunk_index], simulation_settings)[1]
+            yield int(chunk_starts[chunk_index]), outcome
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        next_chunk = 0
+        pending = set()
+        while (next_chunk < len(chunk_starts)) or pending:
+            while (next_chunk < len(chunk_starts)) and (len(pending) < n_workers*max_chunks_in_flight_per_worker): #keep the workers fed without queuing the whole budget at once
+                pending.add( executor.submit(simulate_game_chunk, next_chunk, int(chunk_sizes[next_chunk]), chunk_seed_sequences[next_chunk], simulation_settings) )
+                next_chunk+=1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_index, outcome = future.result()
+                yield int(chunk_starts[chunk_index]), outcome
+
+################################################################################
+##### simulate a full game budget on several cores #####
+#returns the per-game results of every chunk merged in game order
+#pass a TurnTraceStore (trace_store.py) to also keep the turns of every game: they are appended to the store in game order, under trace_strategy
+def simulate_games_parallel(n_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=np.inf, target_turn_score=np.inf, seed=None, n_workers=None, games_per_chunk=default_games_per_chunk, stop_at_target_game_score=False, trace_store=None, trace_strategy=0):
+    check_turn_policy(target_turn_rolls, target_turn_score, stop_at_target_game_score) #the chunk iterator is a generator, so check right away
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    traces_waiting = {} #chunks that finished before the chunks in front of them, keyed by first game
+    next_traced_game = 0
+    outcome = {}
+    outcome['game_score'] = np.zeros(n_games)
+    outcome['total_turns_to_target_game_score'] = np.zeros(n_games, dtype=np.int64)
+    outcome['n_rolls'] = 0
+    for first_game_index, chunk_outcome in iter_simulated_game_chunks(n_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=target_turn_rolls, target_turn_score=target_turn_score, seed=seed, n_workers=n_workers, games_per_chunk=games_per_chunk, stop_at_target_game_score=stop_at_target_game_score, record_turns=trace_store is not None):
+        chunk_games = slice(first_game_index, first_game_index + len(chunk_outcome['game_score']))
+        outcome['game_score'][chunk_games] = chunk_outcome['game_score']
+        outcome['total_turns_to_target_game_score'][chunk_games] = chunk_outcome['total_turns_to_target_game_score']
+        outcome['n_rolls'] += chunk_outcome['n_rolls']
+        if trace_store is not None:
+            traces_waiting[first_game_index] = chunk_outcome
+            while next_traced_game in traces_waiting:
+                chunk_outcome = traces_waiting.pop(next_traced_game)
+                trace_store.append_outcome(chunk_outcome, strategy=trace_strategy)
+                next_traced_game += len(chunk_outcome['game_score'])
+    return outcome
@@ -0,0 +1,212 @@
+################################################################################
+##### description #####
+#the four figures of the 'pass the pigs' analysis, and the curves they show
+#matplotlib is only imported when a figure is drawn. pass headless=True (the command line does) to draw with the non-interactive 'Agg'
+#backend, so figures can be saved on machines without a display
+
+################################################################################
+##### import packages #####
+import os
+
+import numpy as np
+
+from pass_the_pigs.model import strategy_1_score, strategy_2_score
+from pass_the_pigs.turn_distribution import TurnDistributionEngine, turn_pmf_mean, turn_pmf_tail_probability
+
+################################################################################
+##### settings #####
+figure_names = {}
+figure_names['expected_score_and_pig_out_odds'] = 'expected_score__and_pig_out_odds_by_roll.pdf'
+figure_names['strategy_1_expected_outcome'] = 'game_strategy_1_expected_outcome.pdf'
+figure_names['strategy_2_expected_outcome'] = 'game_strategy_2_expected_outcome.pdf'
+figure_names['turns_to_target_histograms'] = 'game_strategy_turns_to_target_histograms.pdf'
+
+default_big_turn_points = 25 #four turns like this win a game to 100
+
+#some color options
+blue = (0.42, 0.78, 0.90)
+orange = (0.96, 0.69, 0.36)
+yellow = (0.98, 0.82, 0.33)
+hot_pink = (0.91, 0.32, 0.51)
+light_pink = (0.96, 0.76, 0.78)
+
+#common plot settings
+common_line_plot_settings = dict( linewidth=2.0, marker='h', markerfacecolor=(1.0, 1.0, 1.0), markeredgewidth=2)
+common_text_annotation_settings = dict( size=12, color='black' )
+
+################################################################################
+##### import pyplot on first use #####
+def load_pyplot(headless=False):
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def save_figure(fig, out_path_figs, figure_name):
+    fig.savefig( os.path.join(out_path_figs, figure_name), dpi=150, format=None, transparent=True ) #facecolor='w', edgecolor='w')
+
+################################################################################
+##### the curves shown in figures 1 to 3 #####
+#expected scores by number of rolls (strategy 1) and by current turn score (strategy 2), from the formulas in model.py,
+#next to the exact values from the full distribution of points banked per turn
+def expected_score_curves(outcome_table, n_rolls=np.arange(0, 21), current_scores=np.arange(0, 101), big_turn_points=default_big_turn_points, turn_distribution_engine=None):
+    if turn_distribution_engine is None:
+        turn_distribution_engine = TurnDistributionEngine(outcome_table.all_possible_scores_array, outcome_table.all_possible_score_probabilities_array)
+    P_pig_out = outcome_table.P_pig_out
+    P_not_pig_out = outcome_table.P_not_pig_out
+    one_roll_expected_score_no_pig_out = outcome_table.one_roll_expected_score_no_pig_out
+
+    curves = {}
+    curves['one_roll_expected_score'] = outcome_table.one_roll_expected_score
+    curves['n_rolls'] = n_rolls
+    curves['P_no_pig_out_n_rolls'] = np.power(P_not_pig_out, n_rolls)
+    curves['n_rolls_expected_score_no_pig_out'] = n_rolls * one_roll_expected_score_no_pig_out
+    curves['strategy_1_scores_list'] = strategy_1_score(n_rolls, one_roll_expected_score_no_pig_out, P_not_pig_out)
+    curves['strategy_1_target_rolls'] = P_not_pig_out / P_pig_out
+    curves['big_turn_points'] = big_turn_points
+    curves['strategy_1_big_turn_probs_list'] = np.asarray([turn_pmf_tail_probability( turn_distribution_engine.roll_count_turn_pmf(n), big_turn_points ) if n > 0 else 0.0 for n in n_rolls]) #exact probability of banking at least big_turn_points with each set number of rolls
+
+    curves['strategy_2_current_scores_list'] = current_scores
+    curves['strategy_2_expected_scores_list'] = strategy_2_score(current_scores, one_roll_expected_score_no_pig_out, P_not_pig_out)
+    curves['strategy_2_target_score'] = (one_roll_expected_score_no_pig_out * P_not_pig_out) / P_pig_out
+    curves['strategy_2_exact_turn_scores_list'] = np.asarray([turn_pmf_mean( turn_distribution_engine.threshold_turn_pmf(score) ) if score > 0 else 0.0 for score in current_scores]) #exact expected points banked over a whole turn when each current score is used as the target turn score
+    return curves
+
+################################################################################
+##### figure 1: the number of points a player can expect by stringing together successive rolls without pigging out #####
+def plot_expected_score_and_pig_out_odds(curves, headless=False):
+    plt = load_pyplot(headless)
+    n_rolls = curves['n_rolls']
+    fig_01 = plt.figure(figsize=(10,5))
+    grid_01 = plt.GridSpec(2,2)
+    axes_01 = []
+    axes_01.append( fig_01.add_subplot(grid_01[:, 0]) )
+    axes_01.append( fig_01.add_subplot(grid_01[:, 1]) )
+
+    axes_01[0].set_title('expected score: never pig out')
+    axes_01[0].set_xlabel('consecutive rolls')
+    axes_01[0].set_ylabel('expected points accrued')
+    axes_01[0].set_xlim(0, len(n_rolls)-1)
+    axes_01[0].set_ylim(0, 100)
+    axes_01[0].set_xticks( n_rolls )
+    axes_01[0].plot( n_rolls, curves['n_rolls_expected_score_no_pig_out'], color=hot_pink, **common_line_plot_settings, markersize=10 )
+
+    axes_01[1].set_title('odds of avoiding a pig out')
+    axes_01[1].set_xlabel('consecutive rolls')
+    axes_01[1].set_ylabel('probability not pigged out')
+    axes_01[1].set_xlim(0, len(n_rolls)-1)
+    axes_01[1].set_ylim(0, 1)
+    axes_01[1].set_xticks( n_rolls )
+    axes_01[1].plot( n_rolls, curves['P_no_pig_out_n_rolls'], color=hot_pink, **common_line_plot_settings, markersize=10 )
+
+    fig_01.tight_layout()
+    return fig_01
+
+################################################################################
+##### figure 2: the score a player can expect from implementing strategy #1 using different set numbers of rolls #####
+def plot_strategy_1_expected_outcome(curves, headless=False):
+    plt = load_pyplot(headless)
+    n_rolls = curves['n_rolls']
+    strategy_1_target_rolls = curves['strategy_1_target_rolls']
+    one_roll_expected_score = curves['one_roll_expected_score']
+    fig_02 = plt.figure(figsize=(5,5))
+    grid_02 = plt.GridSpec(3,3)
+    axes_02 = []
+    axes_02.append( fig_02.add_subplot(grid_02[:, :]) )
+
+    axes_02[0].set_title('strategy 1: always roll n times in a row')
+    axes_02[0].set_xlabel('consecutive rolls in turn')
+    axes_02[0].set_ylabel('expected score for turn')
+    axes_02[0].set_xlim(0, len(n_rolls)-1)
+    axes_02[0].set_ylim(0, 20)
+    axes_02[0].set_xticks( n_rolls )
+    axes_02[0].plot( [strategy_1_target_rolls, strategy_1_target_rolls], [0, 20], ':', color=(0,0,0), linewidth=1.0 )
+    axes_02[0].plot( [0, len(n_rolls)-1], [one_roll_expected_score, one_roll_expected_score], '--', color=(0.50, 0.50, 0.50), linewidth=2.0 )
+    axes_02[0].plot( n_rolls, curves['strategy_1_scores_list'], color=blue, **common_line_plot_settings, markersize=10 )
+    axes_02[0].annotate('inflection point', xy=(strategy_1_target_rolls, 13), xytext=(7, 15), arrowprops=dict(arrowstyle="->", connectionstyle="angle3,angleA=0,angleB=-90") )
+
+    axes_02[0].text( strategy_1_target_rolls - 0.5, 17.5, 'roll more', ha='right', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor='green', edgecolor='green', alpha=0.1) )
+    axes_02[0].text( strategy_1_target_rolls + 0.5, 17.5, 'roll less', ha='left', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor='red', edgecolor='red', alpha=0.1) )
+
+    axes_02[0].text( 9, 4, 'ES for one roll', ha='center', size=10, color='black', bbox=dict(boxstyle='round', facecolor='black', edgecolor='black', alpha=0.1) )
+    axes_02[0].text( 11, 10, 'ES via eq. 4', ha='left', size=10, color='black', bbox=dict(boxstyle='round', facecolor=blue, edgecolor=blue, alpha=0.5) )
+
+    axes_02_tail = axes_02[0].twinx() #exact tail probability from the full distribution of points per turn
+    axes_02_tail.set_ylabel('probability of banking >= {} points'.format(curves['big_turn_points']))
+    axes_02_tail.set_ylim(0, 1)
+    axes_02_tail.plot( n_rolls, curves['strategy_1_big_turn_probs_list'], ':', color=hot_pink, linewidth=2.0 )
+    axes_02_tail.text( 14, 0.2, 'P(>= {} pts)'.format(curves['big_turn_points']), ha='left', size=10, color='black', bbox=dict(boxstyle='round', facecolor=hot_pink, edgecolor=hot_pink, alpha=0.3) )
+
+    fig_02.tight_layout()
+    return fig_02
+
+################################################################################
+##### figure 3: the score a player can expect from implementing strategy #2 when they have different current scores #####
+def plot_strategy_2_expected_outcome(curves, headless=False):
+    plt = load_pyplot(headless)
+    current_scores = curves['strategy_2_current_scores_list']
+    strategy_2_target_score = curves['strategy_2_target_score']
+    fig_03 = plt.figure(figsize=(5,5))
+    grid_03 = plt.GridSpec(3,3)
+    axes_03 = []
+    axes_03.append( fig_03.add_subplot(grid_03[:, :]) )
+
+    axes_03[0].set_title('strategy 2: stop rolling at threshold score')
+    axes_03[0].set_xlabel('current score for turn')
+    axes_03[0].set_ylabel('expected score after next roll')
+    axes_03[0].set_xlim(0, 100)
+    axes_03[0].set_ylim(0, 100)
+    axes_03[0].plot( [strategy_2_target_score, strategy_2_target_score], [0, 100], ':', color=(0,0,0), linewidth=1.0 )
+    axes_03[0].plot( current_scores, current_scores, '--', color=(0.50, 0.50, 0.50), linewidth=2.0 )
+    axes_03[0].plot( current_scores, curves['strategy_2_expected_scores_list'], color=orange, **common_line_plot_settings, markersize=0 )
+    axes_03[0].annotate('intersection', xy=(strategy_2_target_score, strategy_2_target_score), xytext=(40, 20), arrowprops=dict(arrowstyle="->", connectionstyle="angle3,angleA=0,angleB=-90") )
+
+    axes_03[0].text( strategy_2_target_score - 3, 90, 'roll again', ha='right', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor='green', edgecolor='green', alpha=0.1) )
+    axes_03[0].text( strategy_2_target_score + 3, 90, 'stop rolling', ha='left', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor='red', edgecolor='red', alpha=0.1) )
+
+    axes_03[0].text( 70, 75, 'ES = current score', ha='right', size=10, color='black', bbox=dict(boxstyle='round', facecolor='black', edgecolor='black', alpha=0.1) )
+    axes_03[0].text( 65, 50, 'ES via eq. 7', ha='left', size=10, color='black', bbox=dict(boxstyle='round', facecolor=orange, edgecolor=orange, alpha=0.5) )
+
+    axes_03[0].plot( current_scores, curves['strategy_2_exact_turn_scores_list'], ':', color=orange, linewidth=2.0 ) #exact expected points for a whole turn, using the current score as the target
+    axes_03[0].text( 55, 20, 'exact ES per turn', ha='left', size=10, color='black', bbox=dict(boxstyle='round', facecolor=orange, edgecolor=orange, alpha=0.2) )
+
+    fig_03.tight_layout()
+    return fig_03
+
+################################################################################
+##### figure 4: a comparison of the two game strategies #####
+#two histograms. show the distribution of the number of turns required to reach the target game score using each strategy
+def plot_turns_to_target_histograms(n_turns_to_target_score_strat1, n_turns_to_target_score_strat2, headless=False):
+    plt = load_pyplot(headless)
+    n_games = max(len(n_turns_to_target_score_strat1), len(n_turns_to_target_score_strat2))
+    max_games_per_bin = n_games/5
+    mean_turns_to_win_strategy_1 = np.mean(n_turns_to_target_score_strat1)
+    mean_turns_to_win_strategy_2 = np.mean(n_turns_to_target_score_strat2)
+
+    turns_to_target_score_bin_settings = range(0,25)
+    turns_to_target_score_bin_settings = [edge - 0.5 for edge in turns_to_target_score_bin_settings ] #slide the edges back by 0.5 so that bins are centered on integer values
+    turns_to_target_hist_settings = dict(density=False, bins=turns_to_target_score_bin_settings, histtype='stepfilled', alpha=0.6 )
+
+    fig_04 = plt.figure(figsize=(5,5))
+    grid_04 = plt.GridSpec(3,3)
+    axes_04 = []
+    axes_04.append( fig_04.add_subplot(grid_04[:, :]) )
+
+    axes_04[0].set_title('comparing game strategies')
+    axes_04[0].set_xlabel('number of turns')
+    axes_04[0].set_ylabel('number of games')
+    axes_04[0].set_xlim(0,25)
+    axes_04[0].set_ylim(0,max_games_per_bin)
+
+    axes_04[0].hist( n_turns_to_target_score_strat1, **turns_to_target_hist_settings, color=blue )
+    axes_04[0].hist( n_turns_to_target_score_strat2, **turns_to_target_hist_settings, color=orange )
+
+    axes_04[0].plot( [mean_turns_to_win_strategy_1, mean_turns_to_win_strategy_1], [0, max_games_per_bin], '--', linewidth=2.0 )
+    axes_04[0].plot( [mean_turns_to_win_strategy_2, mean_turns_to_win_strategy_2], [0, max_games_per_bin], '--', linewidth=2.0 )
+
+    axes_04[0].text( 20, 0.9*max_games_per_bin, 'WS #1', ha='left', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor=blue, edgecolor=blue, alpha=0.5) )
+    axes_04[0].text( 20, 0.8*max_games_per_bin, 'WS #2', ha='left', **common_text_annotation_settings, bbox=dict(boxstyle='round', facecolor=orange, edgecolor=orange, alpha=0.5) )
+
+    fig_04.tight_layout()
+    return fig_04
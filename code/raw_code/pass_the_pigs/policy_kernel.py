@@ -0,0 +1,172 @@
+################################################################################
+##### description #####
+#scalar game kernel for turn policies that the vectorized simulators cannot express: policies that look at the opponents' scores,
+#at the rolls made so far, or at any state of their own. games are played one roll at a time,
+#but inside a compiled loop when numba is installed. without numba the very same functions run as plain python (slowly, but with identical results)
+#a policy is a function roll_again(seat, turn_score, rolls_this_turn, game_scores, policy_data) -> bool, called after every roll that did not pig out
+#  seat: seat of the player on turn (seat 0 moves first). game_scores: banked scores of every seat. policy_data: any array the policy needs,
+#  passed through untouched (lookup tables, parameters, or scratch space the policy writes to)
+#  scores are counted in integer units of the largest step that divides every roll score (1 point for the standard scoring), see score_unit
+#with numba installed, pass a function compiled with numba.njit (plain python functions are compiled on the fly). three policies come ready-made:
+#table_roll_again looks up a table indexed by (turn_score, rolls_this_turn, game_score), optimal_policy_roll_again follows a policy
+#solved by optimal_policy.py, and optimal_against_tables_roll_again seats a solved policy against table players
+#random numbers come from a splitmix64 generator written out below, so compiled and plain python runs of the same seed play the same games
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+from pass_the_pigs.exact import roll_points_pmf, roll_score_unit, threshold_to_units
+from pass_the_pigs.outcome_table import build_alias_tables
+
+try:
+    import numba
+except ImportError: #plain python fallback
+    numba = None
+
+################################################################################
+##### settings #####
+uint64_mask = 0xFFFFFFFFFFFFFFFF
+splitmix64_increment = 0x9E3779B97F4A7C15
+default_max_turns = 100000 #games that are still going after this many turns (all players only ever roll until they pig out) have no winner
+
+def optional_njit(function):
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+################################################################################
+##### random numbers #####
+#splitmix64: the state steps by a fixed increment, and each state is scrambled into 64 random bits. the masks keep python integers to 64 bits;
+#compiled code wraps around on its own
+@optional_njit
+def next_random_state(state):
+    return (state + splitmix64_increment) & uint64_mask
+
+@optional_njit
+def random_uniform(state):
+    z = state
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & uint64_mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & uint64_mask
+    z = z ^ (z >> 31)
+    return (z >> 11) * (1.0 / 9007199254740992.0) #top 53 bits as a double in [0, 1)
+
+################################################################################
+##### ready-made policies #####
+#roll_tables[seat, turn_score, rolls_this_turn, game_score] is nonzero where the player in that seat rolls again. indices past the end of an axis use
+#its last entry, so an axis of length 1 means the decision does not depend on that quantity (one table for every seat, for example)
+@optional_njit
+def table_roll_again(seat, turn_score, rolls_this_turn, game_scores, roll_tables):
+    return roll_tables[min(seat, roll_tables.shape[0]-1), min(turn_score, roll_tables.shape[1]-1), min(rolls_this_turn, roll_tables.shape[2]-1), min(game_scores[seat], roll_tables.shape[3]-1)] != 0
+
+#roll_decision is the 'roll' array of a solved policy ([my score, opponent's score, my score + turn score]); 2-player games only
+@optional_njit
+def optimal_policy_roll_again(seat, turn_score, rolls_this_turn, game_scores, roll_decision):
+    n_scores = roll_decision.shape[0]
+    my_game_score = game_scores[seat]
+    total = my_game_score + turn_score
+    if total >= n_scores: #holding wins the game
+        return False
+    return roll_decision[my_game_score, min(game_scores[1-seat], n_scores-1), total]
+
+#policy_data = (optimal_seat, roll_decision, roll_tables): the player in optimal_seat follows the solved policy, every other seat looks up roll_tables
+@optional_njit
+def optimal_against_tables_roll_again(seat, turn_score, rolls_this_turn, game_scores, policy_data):
+    optimal_seat, roll_decision, roll_tables = policy_data
+    if seat == optimal_seat:
+        return optimal_policy_roll_again(seat, turn_score, rolls_this_turn, game_scores, roll_decision)
+    return table_roll_again(seat, turn_score, rolls_this_turn, game_scores, roll_tables)
+
+################################################################################
+##### play games one roll at a time #####
+#fills the result arrays in place: winner_seat (-1 when no one won within max_turns), total_turns and total_rolls (by all players together),
+#and game_scores[game, seat], the banked scores at the end of each game. every turn starts with one roll, and a roll scoring 0 is a pig out
+#returns the state of the random number generator, so the next call can carry on from it
+@optional_njit
+def play_policy_games_kernel(random_state, n_players, target_game_units, max_turns, alias_probabilities, alias_indices, roll_units, roll_again, policy_data, winner_seat, total_turns, total_rolls, game_scores):
+    n_outcomes = alias_probabilities.shape[0]
+    for game in range(winner_seat.shape[0]):
+        scores = game_scores[game]
+        for seat in range(n_players):
+            scores[seat] = 0
+        winner_seat[game] = -1
+        seat = 0
+        n_turns = 0
+        n_rolls = 0
+        while n_turns < max_turns:
+            turn_score = 0
+            rolls_this_turn = 0
+            while True:
+                random_state = next_random_state(random_state)
+                scaled_uniform = random_uniform(random_state) * n_outcomes #alias method: the integer part picks a column, the fraction picks its outcome or its alias
+                outcome = int(scaled_uniform)
+                if scaled_uniform - outcome >= alias_probabilities[outcome]:
+                    outcome = alias_indices[outcome]
+                rolls_this_turn += 1
+                if roll_units[outcome] == 0: #pig out: lose all points for the turn
+                    turn_score = 0
+                    break
+                turn_score += roll_units[outcome]
+                if not roll_again(seat, turn_score, rolls_this_turn, scores, policy_data):
+                    break
+            scores[seat] += turn_score
+            n_turns += 1
+            n_rolls += rolls_this_turn
+            if scores[seat] >= target_game_units:
+                winner_seat[game] = seat
+                break
+            seat = (seat + 1) % n_players
+        total_turns[game] = n_turns
+        total_rolls[game] = n_rolls
+    return random_state
+
+################################################################################
+##### play games with any policy #####
+#n_players = 1 plays solitaire games, like simulate_games_batch. pass results (a dictionary with the four arrays named below,
+#int64, sized for n_games) to have them filled in place instead of allocated
+#returns the result arrays and score_unit, the number of points in one score unit
+def play_policy_games(outcome_table, roll_again, policy_data, n_games, n_players=2, target_game_score=100, seed=None, max_turns=default_max_turns, results=None):
+    roll_pmf = roll_points_pmf(outcome_table.all_possible_scores_array, outcome_table.all_possible_score_probabilities_array)
+    score_unit = roll_score_unit(roll_pmf)
+    outcome_quarter_points = np.flatnonzero(roll_pmf > 0)
+    alias_probabilities, alias_indices = build_alias_tables(roll_pmf[outcome_quarter_points])
+    roll_units = (outcome_quarter_points // score_unit).astype(np.int64)
+    target_game_units = threshold_to_units(target_game_score, score_unit)
+
+    if results is None:
+        results = {}
+        results['winner_seat'] = np.empty(n_games, dtype=np.int64)
+        results['total_turns'] = np.empty(n_games, dtype=np.int64)
+        results['total_rolls'] = np.empty(n_games, dtype=np.int64)
+        results['game_scores'] = np.empty((n_games, n_players), dtype=np.int64)
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    random_state = seed_sequence.generate_state(1, dtype=np.uint64)[0]
+
+    if numba is None:
+        random_state = int(random_state) #plain python integers, masked to 64 bits
+    elif not isinstance(roll_again, numba.core.registry.CPUDispatcher):
+        roll_again = numba.njit(roll_again)
+    play_policy_games_kernel(random_state, n_players, target_game_units, max_turns, alias_probabilities, alias_indices.astype(np.int64), roll_units, roll_again, policy_data, results['winner_seat'], results['total_turns'], results['total_rolls'], results['game_scores'])
+    results['score_unit'] = score_unit / 4.0
+    return results
+
+################################################################################
+##### lookup table for a fixed turn policy #####
+#rolls again while fewer than target_turn_rolls rolls have been made and the turn score is below target_turn_score, like simulate_games_batch
+#score_unit is in points, as returned by play_policy_games (1 for the standard scoring)
+def limits_roll_table(target_turn_rolls=np.inf, target_turn_score=np.inf, score_unit=1.0):
+    if np.isinf(target_turn_rolls) and np.isinf(target_turn_score):
+        raise ValueError('a turn needs a roll limit or a target turn score, otherwise it only ends with a pig out')
+    n_turn_scores = int(np.ceil(target_turn_score / score_unit - 1e-9)) + 1 if np.isfinite(target_turn_score) else 1
+    n_rolls = int(np.ceil(target_turn_rolls)) + 1 if np.isfinite(target_turn_rolls) else 1
+    turn_scores = np.arange(n_turn_scores) * score_unit
+    rolls_this_turn = np.arange(n_rolls)
+    roll_table = (turn_scores[:, None] < target_turn_score) & (rolls_this_turn[None, :] < target_turn_rolls)
+    return roll_table[:, :, None] #the game score does not matter
+
+#stacks one table per seat into the roll_tables that table_roll_again expects, padding every axis with its last entry
+def stack_roll_tables(roll_tables):
+    roll_tables = [np.asarray(roll_table, dtype=np.uint8) for roll_table in roll_tables]
+    shape = np.max([roll_table.shape for roll_table in roll_tables], axis=0)
+    padded_tables = [np.pad(roll_table, [(0, n - n_table) for n, n_table in zip(shape, roll_table.shape)], mode='edge') for roll_table in roll_tables]
+    return np.stack(padded_tables)
@@ -0,0 +1,171 @@
+################################################################################
+##### description #####
+#ingestion of raw roll logs (pig_outcomes_per_roll.xlsx, or csv files with the same columns) into a columnar cache,
+#with running orientation counts so that new rolls update the probability estimates without rescanning the rows already ingested
+#each row of a roll log is one roll of both pigs, and the orientation columns count how many of the two pigs landed that way
+
+################################################################################
+##### import packages #####
+import csv
+import json
+import os
+
+import numpy as np
+
+from pass_the_pigs.atomic_files import atomic_write
+from pass_the_pigs.intervals import wilson_interval
+from pass_the_pigs.outcome_table import build_roll_outcome_table
+
+################################################################################
+##### settings #####
+roll_log_columns = ['round', 'spot_side_up', 'spot_side_down', 'trotter', 'razorback', 'snouter', 'leaning_jowler', 'oinker', 'piggy_back']
+orientation_columns = roll_log_columns[1:]
+pigs_per_roll = 2
+default_batch_size = 65536 #rows held in memory at once while reading a log
+cache_state_file_name = 'roll_log_state.json'
+outcome_table_cache_subdir = 'outcome_tables' #outcome tables built from the estimates are kept next to the cached rolls
+
+################################################################################
+##### read a roll log as a stream of batches #####
+#yields (rounds, orientation_counts) arrays with at most batch_size rows each, starting after the first skip_rows data rows
+#rows without a round number (like the sum and probability formulas under the data in the excel file) are skipped
+def iter_roll_log_batches(log_path, skip_rows=0, batch_size=default_batch_size):
+    for rounds, orientation_counts, csv_byte_offset in iter_roll_log_batches_from(log_path, skip_rows, 0, batch_size):
+        yield rounds, orientation_counts
+
+#same, but a csv log can also be resumed at csv_byte_offset (the end of an earlier batch) without reading the rows before it,
+#and every batch comes with the byte offset just after its last row (None for excel logs, which can only skip rows)
+def iter_roll_log_batches_from(log_path, skip_rows=0, csv_byte_offset=0, batch_size=default_batch_size):
+    if log_path.lower().endswith('.csv'):
+        row_iterator = iter_csv_rows(log_path, csv_byte_offset)
+    else:
+        row_iterator = iter_xlsx_rows(log_path)
+    rounds = []
+    orientation_counts = []
+    n_data_rows = 0
+    for row, row_end_offset in row_iterator:
+        if row.get('round') in (None, ''):
+            continue
+        n_data_rows+=1
+        if n_data_rows <= skip_rows: #already ingested
+            continue
+        counts = [int(row.get(orientation) or 0) for orientation in orientation_columns] #empty cells mean no pig landed that way
+        if sum(counts) != pigs_per_roll:
+            raise ValueError('round {} of {} records {} pigs instead of {}'.format(row['round'], log_path, sum(counts), pigs_per_roll))
+        rounds.append(int(row['round']))
+        orientation_counts.append(counts)
+        if len(rounds) == batch_size:
+            yield np.asarray(rounds, dtype=np.int64), np.asarray(orientation_counts, dtype=np.uint8), row_end_offset
+            rounds = []
+            orientation_counts = []
+    if rounds:
+        yield np.asarray(rounds, dtype=np.int64), np.asarray(orientation_counts, dtype=np.uint8), row_end_offset
+
+#yields (row, None): excel rows have no byte offset to resume from
+def iter_xlsx_rows(log_path):
+    import openpyxl #only needed for excel logs
+    workbook = openpyxl.load_workbook(log_path, read_only=True, data_only=True) #read-only mode streams the rows instead of loading the sheet, data_only reads cached formula results
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        column_names = [str(name).strip() if name is not None else '' for name in next(rows)]
+        for values in rows:
+            yield dict(zip(column_names, values)), None
+    finally:
+        workbook.close()
+
+#yields (row, byte offset just after the row). the header is always read from the top, then reading jumps to byte_offset
+#rows are read one line at a time, so a roll log cannot have line breaks inside quoted fields
+def iter_csv_rows(log_path, byte_offset=0):
+    with open(log_path, 'rb') as log_file:
+        column_names = [name.strip() for name in next(csv.reader([log_file.readline().decode('utf-8-sig')]), [])]
+        if byte_offset > 0:
+            if byte_offset > os.fstat(log_file.fileno()).st_size:
+                raise ValueError('{} is shorter than the {} bytes already ingested; it was not only appended to'.format(log_path, byte_offset))
+            log_file.seek(byte_offset)
+        for line in iter(log_file.readline, b''):
+            values = next(csv.reader([line.decode('utf-8')]), [])
+            yield dict(zip(column_names, values)), log_file.tell()
+
+################################################################################
+##### running orientation counts #####
+#pig_counts[k] is the number of pigs that landed in orientation k over all the rolls seen so far
+class OrientationCountAccumulator:
+    def __init__(self, pig_counts=None):
+        self.pig_counts = np.zeros(len(orientation_columns), dtype=np.int64) if pig_counts is None else np.asarray(pig_counts, dtype=np.int64)
+
+    @property
+    def n_pigs(self):
+        return int(self.pig_counts.sum())
+
+    @property
+    def n_rolls(self):
+        return self.n_pigs // pigs_per_roll
+
+    def update(self, orientation_counts):
+        self.pig_counts += np.asarray(orientation_counts, dtype=np.int64).sum(axis=0)
+
+    def probabilities(self):
+        return self.pig_counts / max(self.n_pigs, 1)
+
+    ##### wilson score interval for each orientation probability #####
+    #the two pigs of a roll are treated as independent draws, like the outcome table does
+    def confidence_intervals(self, confidence=0.95):
+        return wilson_interval(self.pig_counts, self.n_pigs, confidence)
+
+    def per_pig_per_roll_probs(self):
+        return dict(zip(orientation_columns, self.probabilities().tolist()))
+
+################################################################################
+##### columnar cache of an ingested roll log #####
+#every ingest appends one pair of .npy files (rounds and uint8 orientation counts) to the cache directory, and a small json file keeps the
+#running counts, the number of rows already ingested and, for csv logs, the byte offset where they end, so the next ingest only reads the rows added since
+def load_cache_state(cache_dir):
+    state_path = os.path.join(cache_dir, cache_state_file_name)
+    if not os.path.exists(state_path):
+        return {'source': None, 'rows_ingested': 0, 'csv_byte_offset': 0, 'pig_counts': [0]*len(orientation_columns), 'parts': []}
+    with open(state_path) as state_file:
+        return json.load(state_file)
+
+def save_cache_state(cache_dir, state):
+    state_path = os.path.join(cache_dir, cache_state_file_name)
+    with atomic_write(state_path) as state_file: #the cache never points at half-written state
+        json.dump(state, state_file, indent=1)
+
+def ingest_roll_log(log_path, cache_dir, batch_size=default_batch_size):
+    os.makedirs(cache_dir, exist_ok=True)
+    state = load_cache_state(cache_dir)
+    if (state['source'] is not None) and (state['source'] != os.path.abspath(log_path)):
+        raise ValueError('{} caches {}, not {}'.format(cache_dir, state['source'], log_path))
+    state['source'] = os.path.abspath(log_path)
+    accumulator = OrientationCountAccumulator(state['pig_counts'])
+    csv_byte_offset = state.get('csv_byte_offset', 0)
+    skip_rows = 0 if csv_byte_offset > 0 else state['rows_ingested'] #a csv log resumes at its byte offset, an excel log has to skip the ingested rows
+    for rounds, orientation_counts, csv_byte_offset in iter_roll_log_batches_from(log_path, skip_rows, csv_byte_offset, batch_size):
+        part_name = 'rolls_{:06d}'.format(len(state['parts']))
+        np.save(os.path.join(cache_dir, part_name + '_round.npy'), rounds)
+        np.save(os.path.join(cache_dir, part_name + '_orientation_counts.npy'), orientation_counts)
+        accumulator.update(orientation_counts)
+        state['parts'].append(part_name)
+        state['rows_ingested'] += len(rounds)
+        state['csv_byte_offset'] = csv_byte_offset or 0
+        state['pig_counts'] = accumulator.pig_counts.tolist()
+        save_cache_state(cache_dir, state) #after every batch, so an interrupted ingest resumes where it stopped
+    return accumulator
+
+##### read the cached rolls back, memory-mapped #####
+def load_cached_rolls(cache_dir):
+    state = load_cache_state(cache_dir)
+    rounds = [np.load(os.path.join(cache_dir, part_name + '_round.npy'), mmap_mode='r') for part_name in state['parts']]
+    orientation_counts = [np.load(os.path.join(cache_dir, part_name + '_orientation_counts.npy'), mmap_mode='r') for part_name in state['parts']]
+    if not rounds:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(orientation_columns)), dtype=np.uint8)
+    return np.concatenate(rounds), np.concatenate(orientation_counts)
+
+################################################################################
+##### refresh the roll model from a log #####
+#ingests any new rows, then builds the outcome table from the updated estimates. outcome tables are memoized by their inputs (in memory, and on disk under cache_dir),
+#so the table is only rebuilt when the estimates actually changed
+def load_roll_model(log_path, cache_dir, per_roll_points=None):
+    accumulator = ingest_roll_log(log_path, cache_dir)
+    outcome_table = build_roll_outcome_table(accumulator.per_pig_per_roll_probs(), per_roll_points, cache_dir=os.path.join(cache_dir, outcome_table_cache_subdir))
+    return accumulator, outcome_table
@@ -0,0 +1,103 @@
+################################################################################
+##### description #####
+#sequential comparison of two turn policies: games are simulated in batches and the simulation stops as soon as the comparison is decided
+#only running means and variances are kept (welford's method), never the individual games, and the decision uses an always-valid
+#confidence sequence, so looking at the result after every batch does not inflate the error rate the way repeated t-tests would
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+from pass_the_pigs.simulation import check_scoring_outcomes, check_turn_policy, simulate_games_batch
+
+################################################################################
+##### settings #####
+default_batch_size = 500
+default_max_games = 1000000
+default_fixed_n_games = 10000 #number of games per strategy in the fixed-size comparison, used to report the games saved
+
+################################################################################
+##### running mean and variance (welford's method, merged one batch at a time) #####
+class RunningMoments:
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch_mean = values.mean()
+        batch_sum_squared_deviations = np.sum((values - batch_mean)**2)
+        n_total = self.n + values.size
+        delta = batch_mean - self.mean
+        self.mean += delta * values.size / n_total
+        self.sum_squared_deviations += batch_sum_squared_deviations + delta**2 * self.n * values.size / n_total
+        self.n = n_total
+
+    @property
+    def variance(self):
+        return self.sum_squared_deviations / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+################################################################################
+##### half-width of an always-valid confidence sequence for a mean #####
+#normal-mixture boundary (asymptotic confidence sequence): with probability at least 1 - alpha the true mean lies within this distance of the
+#running mean at every sample size at once. rho sets the sample size at which the sequence is tightest
+def confidence_sequence_radius(n, std, alpha, rho):
+    return std * np.sqrt( 2*(n*rho**2 + 1) / (n**2 * rho**2) * np.log( np.sqrt(n*rho**2 + 1) / alpha ) )
+
+def confidence_sequence_rho(alpha, tightest_n):
+    return np.sqrt( (-2*np.log(alpha) + np.log(-2*np.log(alpha) + 1)) / tightest_n )
+
+################################################################################
+##### compare two policies, stopping as soon as the comparison is decided #####
+#a policy is (target_turn_rolls, target_turn_score), as in simulate_games_batch. game k of policy a is paired with game k of policy b, and the two are
+#simulated from independent random streams, so the per-pair difference in turns has the same mean as the difference of the two means
+#the comparison stops when the confidence sequence for the mean difference excludes 0, when it lies entirely within +/- indifference_margin turns,
+#or when max_games games per policy have been played. a policy without a roll limit or target turn score raises ValueError before any game is played
+def compare_policies_sequentially(all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_game_score, policy_a, policy_b, alpha=0.05, batch_size=default_batch_size, max_games=default_max_games, fixed_n_games=default_fixed_n_games, indifference_margin=0.0, seed=None):
+    check_turn_policy(*policy_a)
+    check_turn_policy(*policy_b)
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    rng_a, rng_b = [np.random.default_rng(stream) for stream in seed_sequence.spawn(2)]
+    rho = confidence_sequence_rho(alpha, fixed_n_games)
+    turns_a = RunningMoments()
+    turns_b = RunningMoments()
+    turns_difference = RunningMoments()
+    decision = 'no_decision'
+    radius = np.inf
+    while turns_difference.n < max_games:
+        n_batch_games = min(batch_size, max_games - turns_difference.n)
+        batch_turns_a = simulate_games_batch(n_batch_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=policy_a[0], target_turn_score=policy_a[1], rng=rng_a, record_turns=False)['total_turns_to_target_game_score']
+        batch_turns_b = simulate_games_batch(n_batch_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=policy_b[0], target_turn_score=policy_b[1], rng=rng_b, record_turns=False)['total_turns_to_target_game_score']
+        turns_a.update(batch_turns_a)
+        turns_b.update(batch_turns_b)
+        turns_difference.update(batch_turns_a - batch_turns_b)
+
+        radius = confidence_sequence_radius(turns_difference.n, turns_difference.std, alpha, rho)
+        if turns_difference.mean - radius > 0:
+            decision = 'b_fewer_turns'
+        elif turns_difference.mean + radius < 0:
+            decision = 'a_fewer_turns'
+        elif (indifference_margin > 0) and (abs(turns_difference.mean) + radius < indifference_margin):
+            decision = 'equivalent'
+        if decision != 'no_decision':
+            break
+
+    comparison = {}
+    comparison['decision'] = decision
+    comparison['n_games'] = turns_difference.n #per policy
+    comparison['games_saved'] = fixed_n_games - turns_difference.n #per policy, compared with the fixed-size run. negative when more games were needed
+    comparison['mean_turns_a'] = turns_a.mean
+    comparison['mean_turns_b'] = turns_b.mean
+    comparison['std_turns_a'] = turns_a.std
+    comparison['std_turns_b'] = turns_b.std
+    comparison['mean_difference'] = turns_difference.mean
+    comparison['confidence_sequence'] = (turns_difference.mean - radius, turns_difference.mean + radius)
+    return comparison
@@ -0,0 +1,163 @@
+################################################################################
+##### description #####
+#vectorized batch simulator for single-player 'pass the pigs' games
+#instead of rolling one pair of pigs at a time inside nested python loops, every game that is still in progress is rolled at once as a numpy array
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+################################################################################
+##### settings #####
+n_guide_cells = 4096 #number of equal-width cells in the lookup table that maps a random cumulative probability straight to a roll score
+pig_out_turn_score = 1.0e9 #a pig out is recorded as this huge score so that a single comparison against the turn threshold ends the turn
+finished_game_turn_score = -1.0e18 #games that are over sit at this turn score and roll count until they are dropped, so they can never end another turn
+finished_game_rolls = -2**62
+
+################################################################################
+##### map random cumulative probabilities to roll scores #####
+#a random value u picks the first outcome whose cumulative probability exceeds u (all_possible_scores_array[all_possible_score_cumulative_probabilities_array > u][0])
+#np.searchsorted finds that outcome. to avoid a binary search for every roll, the [0, 1) interval is cut into equal cells and the outcome is
+#stored for every cell that lies entirely inside one outcome. only values that land in the few cells straddling a boundary are searched
+def build_roll_score_lookup(all_possible_scores_array, all_possible_score_cumulative_probabilities_array):
+    last_outcome = len(all_possible_scores_array)-1
+    cell_edges = np.arange(n_guide_cells+1) / n_guide_cells
+    cell_edge_outcomes = np.minimum(np.searchsorted(all_possible_score_cumulative_probabilities_array, cell_edges, side='right'), last_outcome) #outcome at each cell edge. guard against cumulative probabilities that add up to slightly less than 1
+    roll_scores = np.where(all_possible_scores_array > 0, all_possible_scores_array, pig_out_turn_score)
+    cell_roll_scores = np.where(cell_edge_outcomes[:-1] == cell_edge_outcomes[1:], roll_scores[cell_edge_outcomes[:-1]], np.nan) #nan marks cells that straddle an outcome boundary
+    return cell_roll_scores, roll_scores
+
+def lookup_roll_scores(roll_test_vals, cell_roll_scores, roll_scores, all_possible_score_cumulative_probabilities_array):
+    roll_score = cell_roll_scores[(roll_test_vals * n_guide_cells).astype(np.intp)]
+    straddling = np.flatnonzero(np.isnan(roll_score))
+    if straddling.size > 0:
+        outcome_indices = np.searchsorted(all_possible_score_cumulative_probabilities_array, roll_test_vals[straddling], side='right')
+        roll_score[straddling] = roll_scores[np.minimum(outcome_indices, len(roll_scores)-1)]
+    return roll_score
+
+################################################################################
+##### draw the scores for a block of rolls #####
+#pig outs come back as 0 points, just like all_possible_scores_array
+def draw_roll_scores(rng, n_rolls, all_possible_scores_array, all_possible_score_cumulative_probabilities_array):
+    cell_roll_scores, roll_scores = build_roll_score_lookup(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    roll_score = lookup_roll_scores(rng.random(n_rolls), cell_roll_scores, roll_scores, all_possible_score_cumulative_probabilities_array)
+    roll_score[roll_score >= pig_out_turn_score] = 0.0
+    return roll_score
+
+################################################################################
+##### reject settings under which games never end #####
+#a turn with neither a roll limit nor a target turn score only ends with a pig out and never banks points (unless players stop as soon as banking wins),
+#and a game whose rolls can never score never gets closer to the target. the simulators would loop forever, so both are rejected before any roll
+#the limits may also be arrays (one policy per element, e.g. every seat of every game of a tournament)
+def check_turn_policy(target_turn_rolls, target_turn_score, stop_at_target_game_score=False):
+    if np.any(np.asarray(target_turn_rolls) <= 0) or np.any(np.asarray(target_turn_score) <= 0):
+        raise ValueError('a turn must allow at least one roll, otherwise the target game score is never reached')
+    if np.any(np.isinf(target_turn_rolls) & np.isinf(target_turn_score)) and not stop_at_target_game_score:
+        raise ValueError('a turn needs a roll limit or a target turn score, otherwise it only ends with a pig out')
+
+def check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array):
+    outcome_probabilities = np.diff(np.asarray(all_possible_score_cumulative_probabilities_array, dtype=float), prepend=0.0)
+    if not np.any((np.asarray(all_possible_scores_array, dtype=float) > 0) & (outcome_probabilities > 0)):
+        raise ValueError('no roll ever scores points, so the target game score is never reached')
+
+################################################################################
+##### park finished games, and drop them once enough have piled up #####
+#a finished game keeps rolling with the rest of its block until it is dropped, so it is parked where no roll can end its turn again.
+#game_score is the score that is checked against the target game score (the score of the player on turn, in multi-player games)
+#returns the number of games parked
+def park_finished_games(finished, turn_score, n_rolls_this_turn, game_score):
+    turn_score[finished] = finished_game_turn_score
+    n_rolls_this_turn[finished] = finished_game_rolls
+    game_score[finished] = -np.inf #keeps parked games from ever looking like they reached the target again
+    return finished.size
+
+#drops the parked games once they are more than a quarter of the block, so later rolls only touch games in progress. dropping is a copy
+#of every per-game array, so it waits until that pays off. game_arrays are the other per-game arrays (first axis = game)
+#returns the new number of parked games, turn_score and game_arrays, in that order
+def drop_parked_games(n_parked_games, turn_score, *game_arrays):
+    if 4*n_parked_games <= turn_score.size:
+        return (n_parked_games, turn_score) + game_arrays
+    still_playing = turn_score > finished_game_turn_score/2
+    return (0, turn_score[still_playing]) + tuple(game_array[still_playing] for game_array in game_arrays)
+
+################################################################################
+##### simulate many games at once #####
+#a turn continues while fewer than target_turn_rolls rolls have been made AND the turn score is below target_turn_score
+#strategy 1 only sets target_turn_rolls, strategy 2 only sets target_turn_score
+#the per-turn results come back in columnar form: the turns of game i are rolls_per_turn[turn_offsets[i]:turn_offsets[i+1]] (and likewise for points_per_turn)
+#at least one of the two limits must be finite (or stop_at_target_game_score set), see check_turn_policy
+def simulate_games_batch(n_games, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, target_turn_rolls=np.inf, target_turn_score=np.inf, rng=None, record_turns=True, stop_at_target_game_score=False):
+    check_turn_policy(target_turn_rolls, target_turn_score, stop_at_target_game_score)
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    if rng is None:
+        rng = np.random.default_rng()
+    all_possible_scores_array = np.asarray(all_possible_scores_array, dtype=float)
+    all_possible_score_cumulative_probabilities_array = np.asarray(all_possible_score_cumulative_probabilities_array, dtype=float)
+    cell_roll_scores, roll_scores = build_roll_score_lookup(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    turn_score_cap = min(target_turn_score, pig_out_turn_score) #a pig out always ends the turn, even when only the number of rolls is limited
+    limit_turn_rolls = np.isfinite(target_turn_rolls)
+
+    final_game_score = np.zeros(n_games) #game score of each game once it is over
+    total_turns_to_target_game_score = np.zeros(n_games, dtype=np.int64) #number of turns each game took
+
+    #state of the games in progress. finished games are parked at finished_game_turn_score and dropped once enough of them pile up
+    game_index = np.arange(n_games)
+    game_score = np.zeros(n_games)
+    turn_score = np.zeros(n_games)
+    n_rolls_this_turn = np.zeros(n_games, dtype=np.int64)
+    n_turns = np.zeros(n_games, dtype=np.int64)
+    n_parked_games = 0
+    n_rolls = 0 #rolls made by games in progress (parked games roll too, but those rolls are thrown away)
+
+    turn_game_index_blocks = [np.zeros(0, dtype=np.int64)] #game that each completed turn belongs to
+    turn_number_blocks = [np.zeros(0, dtype=np.int64)] #how many turns that game had already completed before this one
+    rolls_per_turn_blocks = [np.zeros(0, dtype=np.int64)]
+    points_per_turn_blocks = [np.zeros(0)]
+
+    while game_index.size > n_parked_games: #keep rolling until every game has reached the target game score
+        turn_score += lookup_roll_scores(rng.random(game_index.size), cell_roll_scores, roll_scores, all_possible_score_cumulative_probabilities_array) #one roll for every game in the block
+        n_rolls_this_turn += 1
+        n_rolls += game_index.size - n_parked_games
+
+        turn_over = turn_score >= turn_score_cap
+        if limit_turn_rolls:
+            turn_over |= n_rolls_this_turn >= target_turn_rolls
+        if stop_at_target_game_score: #stop rolling as soon as banking the turn would win the game
+            turn_over |= (game_score + turn_score) >= target_game_score
+        ended = np.flatnonzero(turn_over)
+        if ended.size == 0:
+            continue
+
+        points_this_turn = turn_score[ended]
+        n_rolls_ended_turn = n_rolls_this_turn[ended]
+        points_this_turn[points_this_turn >= pig_out_turn_score] = 0.0 #lose all points for the turn on a pig out
+        if record_turns:
+            turn_game_index_blocks.append(game_index[ended])
+            turn_number_blocks.append(n_turns[ended])
+            rolls_per_turn_blocks.append(n_rolls_ended_turn)
+            points_per_turn_blocks.append(points_this_turn)
+        game_score[ended] += points_this_turn #bank the points from the turns that just ended
+        n_turns[ended] += 1
+        turn_score[ended] = 0.0
+        n_rolls_this_turn[ended] = 0
+
+        finished = ended[game_score[ended] >= target_game_score]
+        if finished.size > 0:
+            final_game_score[game_index[finished]] = game_score[finished]
+            total_turns_to_target_game_score[game_index[finished]] = n_turns[finished]
+            n_parked_games += park_finished_games(finished, turn_score, n_rolls_this_turn, game_score)
+            n_parked_games, turn_score, game_index, game_score, n_rolls_this_turn, n_turns = drop_parked_games(n_parked_games, turn_score, game_index, game_score, n_rolls_this_turn, n_turns)
+
+    outcome = {}
+    outcome['game_score'] = final_game_score
+    outcome['total_turns_to_target_game_score'] = total_turns_to_target_game_score
+    outcome['n_rolls'] = n_rolls
+    if record_turns:
+        turn_offsets = np.concatenate(([0], np.cumsum(total_turns_to_target_game_score)))
+        turn_position = turn_offsets[np.concatenate(turn_game_index_blocks)] + np.concatenate(turn_number_blocks) #each turn goes straight into its slot: the start of its game plus the number of turns the game had already played
+        outcome['rolls_per_turn'] = np.zeros(turn_offsets[-1], dtype=np.int64)
+        outcome['rolls_per_turn'][turn_position] = np.concatenate(rolls_per_turn_blocks)
+        outcome['points_per_turn'] = np.zeros(turn_offsets[-1])
+        outcome['points_per_turn'][turn_position] = np.concatenate(points_per_turn_blocks)
+        outcome['turn_offsets'] = turn_offsets
+    return outcome
@@ -0,0 +1,41 @@
+################################################################################
+##### description #####
+#strategy-level game simulation: play many games of a turn policy from a roll outcome table, and compare two policies with a t-test
+#the batch simulator (simulation.py) and the multi-core runner (parallel.py) do the work; scipy is only imported when a t-test is run
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+from pass_the_pigs.parallel import simulate_games_parallel
+
+################################################################################
+##### settings #####
+default_n_games = 10000
+default_target_game_score = 100
+
+################################################################################
+##### simulate games of one turn policy #####
+#a policy is (target_turn_rolls, target_turn_score), as in simulate_games_batch
+#returns a dictionary with the number of turns each game needed to reach the target game score and its mean and standard deviation
+def simulate_policy_games(outcome_table, policy, n_games=default_n_games, target_game_score=default_target_game_score, seed=None, n_workers=1):
+    outcome = simulate_games_parallel(n_games, target_game_score, outcome_table.all_possible_scores_array, outcome_table.all_possible_score_cumulative_probabilities_array, target_turn_rolls=policy[0], target_turn_score=policy[1], seed=seed, n_workers=n_workers)
+    simulated = {}
+    simulated['total_turns_to_target_game_score'] = outcome['total_turns_to_target_game_score']
+    simulated['n_rolls'] = outcome['n_rolls']
+    simulated['mean_turns'] = float(np.mean(outcome['total_turns_to_target_game_score']))
+    simulated['std_turns'] = float(np.std(outcome['total_turns_to_target_game_score'], ddof=1))
+    return simulated
+
+################################################################################
+##### welch's t-test: does policy a need fewer turns than policy b? #####
+#two-sided test without assuming equal variances; the one-sided p-value is half the two-sided one when t points the right way
+def compare_simulated_turns(turns_a, turns_b, alpha=0.05):
+    from scipy import stats #only needed here, and slow to import
+    t_stat, two_side_p_val = stats.ttest_ind( turns_a, turns_b, equal_var=False )
+    comparison = {}
+    comparison['t_stat'] = float(t_stat)
+    comparison['two_side_p_val'] = float(two_side_p_val)
+    comparison['one_side_p_val'] = float(two_side_p_val) / 2
+    comparison['a_fewer_turns'] = bool( (t_stat < 0) and (comparison['one_side_p_val'] < alpha) )
+    return comparison
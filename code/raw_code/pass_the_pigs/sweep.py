@@ -0,0 +1,138 @@
+################################################################################
+##### description #####
+#parameter sweep over turn policies (strategy 1 roll counts and strategy 2 target turn scores) and target game scores
+#every grid cell is evaluated exactly with the markov chain in exact.py, so there is no sampling noise to share or cancel between cells,
+#and the work that cells have in common is done once: the turn distributions for all target turn scores come from one shared pass,
+#and each policy's turns-to-target distributions for every target game score come from one run of the chain
+#results are checkpointed to a single .npz file with one column per quantity, and a sweep that was interrupted resumes from that file
+
+################################################################################
+##### import packages #####
+import os
+
+import numpy as np
+
+from pass_the_pigs.atomic_files import atomic_path
+from pass_the_pigs.exact import roll_points_pmf, roll_score_unit, stacked_pmf_moments, stacked_turns_comparison, threshold_to_units, threshold_turn_pmfs_on_grid, turn_pmf_on_grid, turns_to_targets_pmfs_on_grid
+
+################################################################################
+##### settings #####
+default_target_turn_rolls_grid = np.arange(1, 21)
+default_target_turn_score_grid = np.arange(0, 400+1) / 4.0 #0 to 100 points in quarter-point steps
+default_target_game_score_grid = np.arange(50, 500+1, 50)
+default_sweep_tolerance = 1e-10
+checkpoint_every_n_policies = 25
+
+roll_count_policy = 0 #policy_kind of strategy 1 style policies: roll a set number of times
+turn_score_policy = 1 #policy_kind of strategy 2 style policies: roll until the turn score reaches a target
+
+################################################################################
+##### summaries of a turns-to-target distribution against the opponent's #####
+#the swept player takes the first turn, so they win whenever they need no more turns than the opponent
+def turns_summaries(turns_pmfs, opponent_turns_pmfs):
+    mean_turns, std_turns = stacked_pmf_moments(turns_pmfs, np.arange(turns_pmfs.shape[1], dtype=float))
+    prob_fewer_turns, prob_same_turns = stacked_turns_comparison(turns_pmfs, opponent_turns_pmfs)
+    return mean_turns, std_turns, prob_fewer_turns + prob_same_turns
+
+################################################################################
+##### sweep the grid #####
+#every policy plays against opponent_policy = (target_turn_rolls, target_turn_score), e.g. strategy 2 as (np.inf, 22.0)
+#returns the columns of the sweep (one entry per policy and target game score) and writes them to output_path as they are computed
+def sweep_strategy_grid(all_possible_scores_array, all_possible_score_probabilities_array, output_path, opponent_policy, target_turn_rolls_grid=default_target_turn_rolls_grid, target_turn_score_grid=default_target_turn_score_grid, target_game_score_grid=default_target_game_score_grid, tolerance=default_sweep_tolerance):
+    opponent_target_turn_rolls, opponent_target_turn_score = opponent_policy
+    if np.isinf(opponent_target_turn_rolls) and np.isinf(opponent_target_turn_score):
+        raise ValueError('the opponent needs a roll limit or a target turn score')
+    if not output_path.endswith('.npz'):
+        output_path = output_path + '.npz'
+    target_turn_rolls_grid = np.asarray(target_turn_rolls_grid, dtype=float)
+    target_turn_score_grid = np.asarray(target_turn_score_grid, dtype=float)
+    target_game_score_grid = np.asarray(target_game_score_grid, dtype=float)
+
+    #work in the largest score unit that every roll is a multiple of, so the chain has as few states as possible
+    roll_pmf = roll_points_pmf(all_possible_scores_array, all_possible_score_probabilities_array)
+    score_unit = roll_score_unit(roll_pmf)
+    unit_roll_pmf = roll_pmf[::score_unit]
+    target_game_units = np.asarray([threshold_to_units(target, score_unit) for target in target_game_score_grid])
+
+    #the grid: every policy is paired with every target game score
+    policy_kind = np.concatenate((np.full(len(target_turn_rolls_grid), roll_count_policy), np.full(len(target_turn_score_grid), turn_score_policy)))
+    policy_value = np.concatenate((target_turn_rolls_grid, target_turn_score_grid))
+    n_policies = len(policy_value)
+    n_targets = len(target_game_score_grid)
+    sweep = {}
+    sweep['policy_kind'] = np.repeat(policy_kind, n_targets)
+    sweep['policy_value'] = np.repeat(policy_value, n_targets)
+    sweep['target_game_score'] = np.tile(target_game_score_grid, n_policies)
+    sweep['mean_turns'] = np.full(n_policies*n_targets, np.nan)
+    sweep['std_turns'] = np.full(n_policies*n_targets, np.nan)
+    sweep['win_rate'] = np.full(n_policies*n_targets, np.nan)
+    sweep['done'] = np.zeros(n_policies*n_targets, dtype=bool)
+    sweep['roll_probabilities'] = roll_pmf
+    sweep['opponent_policy'] = np.asarray([opponent_target_turn_rolls, opponent_target_turn_score], dtype=float)
+
+    if os.path.exists(output_path): #resume an interrupted sweep
+        saved = load_sweep(output_path)
+        for column in ['policy_kind', 'policy_value', 'target_game_score', 'roll_probabilities', 'opponent_policy']:
+            if (saved[column].shape != sweep[column].shape) or (not np.array_equal(saved[column], sweep[column])):
+                raise ValueError('{} holds a different sweep ({} does not match); remove it or choose another output path'.format(output_path, column))
+        for column in ['mean_turns', 'std_turns', 'win_rate', 'done']:
+            sweep[column] = saved[column]
+
+    opponent_max_turn_rolls = int(np.ceil(opponent_target_turn_rolls)) if np.isfinite(opponent_target_turn_rolls) else None
+    opponent_target_turn_units = threshold_to_units(opponent_target_turn_score, score_unit) if np.isfinite(opponent_target_turn_score) else None
+    opponent_turn_pmf = turn_pmf_on_grid(unit_roll_pmf, max_turn_rolls=opponent_max_turn_rolls, target_turn_grid_points=opponent_target_turn_units)
+    opponent_turns_pmfs = turns_to_targets_pmfs_on_grid(opponent_turn_pmf, target_game_units, tolerance=tolerance)
+
+    #turn distributions, keyed by what the policy means on the unit grid. target turn scores that round up to the same number of units share one
+    turn_pmfs = {}
+    for policy_index in range(len(target_turn_rolls_grid)):
+        if target_turn_rolls_grid[policy_index] > 0:
+            turn_pmfs[(roll_count_policy, int(np.ceil(target_turn_rolls_grid[policy_index])))] = None
+    target_turn_units_list = sorted({threshold_to_units(threshold, score_unit) for threshold in target_turn_score_grid if threshold > 0})
+    if target_turn_units_list:
+        for target_turn_units, turn_pmf in zip(target_turn_units_list, threshold_turn_pmfs_on_grid(unit_roll_pmf, target_turn_units_list)):
+            turn_pmfs[(turn_score_policy, target_turn_units)] = turn_pmf
+    summaries = {}
+
+    n_policies_since_checkpoint = 0
+    for policy_index in range(n_policies):
+        cells = slice(policy_index*n_targets, (policy_index+1)*n_targets)
+        if sweep['done'][cells].all():
+            continue
+        if policy_value[policy_index] <= 0: #the turn never rolls, so the target game score is never reached
+            sweep['mean_turns'][cells] = np.inf
+            sweep['win_rate'][cells] = 0.0
+        else:
+            if policy_kind[policy_index] == roll_count_policy:
+                policy_key = (roll_count_policy, int(np.ceil(policy_value[policy_index])))
+                if turn_pmfs[policy_key] is None:
+                    turn_pmfs[policy_key] = turn_pmf_on_grid(unit_roll_pmf, max_turn_rolls=policy_key[1])
+            else:
+                policy_key = (turn_score_policy, threshold_to_units(policy_value[policy_index], score_unit))
+            if policy_key not in summaries:
+                turns_pmfs = turns_to_targets_pmfs_on_grid(turn_pmfs[policy_key], target_game_units, tolerance=tolerance)
+                summaries[policy_key] = turns_summaries(turns_pmfs, opponent_turns_pmfs)
+            sweep['mean_turns'][cells], sweep['std_turns'][cells], sweep['win_rate'][cells] = summaries[policy_key]
+        sweep['done'][cells] = True
+        n_policies_since_checkpoint+=1
+        if n_policies_since_checkpoint >= checkpoint_every_n_policies:
+            save_sweep(output_path, sweep)
+            n_policies_since_checkpoint = 0
+    save_sweep(output_path, sweep)
+    return sweep
+
+################################################################################
+##### save and load sweep results #####
+def save_sweep(output_path, sweep):
+    with atomic_path(output_path) as temporary_path: #an interruption never leaves a half-written file behind
+        np.savez(temporary_path, **sweep)
+
+def load_sweep(output_path):
+    with np.load(output_path) as saved:
+        return {column: saved[column] for column in saved.files}
+
+##### reshape one column of a sweep into a (policy, target game score) grid for one policy kind, e.g. for a heatmap #####
+def sweep_grid(sweep, column, policy_kind):
+    policy_cells = sweep['policy_kind'] == policy_kind
+    target_game_score_grid = np.unique(sweep['target_game_score'])
+    return sweep[column][policy_cells].reshape(-1, len(target_game_score_grid))
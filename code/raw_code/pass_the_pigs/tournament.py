@@ -0,0 +1,218 @@
+################################################################################
+##### description #####
+#round-robin tournaments between turn policies: 2 to 6 players take turns until one of them banks the target game score and wins
+#a policy is (target_turn_rolls, target_turn_score), as in simulate_games_batch, so strategy 1 players (a roll limit),
+#strategy 2 players (a target turn score) and players that use both limits can sit at the same table
+#every game of every matchup is played at once in one vectorized batch: each game carries the turn limits of its players, and one roll is
+#made per step for whoever is on turn in every game still in progress. the seats of each matchup are rotated from game to game,
+#so every policy moves first equally often
+#games are cut into fixed-size chunks with their own random streams (like parallel.py), and each chunk is reduced to win counts right away,
+#so memory does not grow with the number of games and the results for a given seed do not depend on the number of workers
+
+################################################################################
+##### import packages #####
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pass_the_pigs.intervals import wilson_interval
+from pass_the_pigs.simulation import build_roll_score_lookup, check_scoring_outcomes, check_turn_policy, drop_parked_games, lookup_roll_scores, park_finished_games, pig_out_turn_score
+
+################################################################################
+##### settings #####
+min_players = 2
+max_players = 6
+default_games_per_matchup = 10000
+default_games_per_chunk = 100000
+
+################################################################################
+##### play many multi-player games at once #####
+#seat_target_turn_rolls[g, s] and seat_target_turn_score[g, s] are the turn limits of the player in seat s of game g. seat 0 moves first
+#returns the seat of the winner of each game and the number of turns played in each game (by all players together)
+def play_games_batch(seat_target_turn_rolls, seat_target_turn_score, target_game_score, all_possible_scores_array, all_possible_score_cumulative_probabilities_array, rng=None, stop_at_target_game_score=False):
+    seat_target_turn_rolls = np.asarray(seat_target_turn_rolls, dtype=float)
+    seat_target_turn_score = np.asarray(seat_target_turn_score, dtype=float)
+    check_turn_policy(seat_target_turn_rolls, seat_target_turn_score, stop_at_target_game_score)
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    if rng is None:
+        rng = np.random.default_rng()
+    all_possible_score_cumulative_probabilities_array = np.asarray(all_possible_score_cumulative_probabilities_array, dtype=float)
+    cell_roll_scores, roll_scores = build_roll_score_lookup(np.asarray(all_possible_scores_array, dtype=float), all_possible_score_cumulative_probabilities_array)
+    n_games, n_players = seat_target_turn_rolls.shape
+
+    winner_seat = np.zeros(n_games, dtype=np.int64)
+    total_turns = np.zeros(n_games, dtype=np.int64)
+
+    #state of the games in progress, one entry per game. the turn limits of the player on turn are copied out of the seat arrays when their turn starts
+    game_index = np.arange(n_games)
+    game_scores = np.zeros((n_games, n_players))
+    seat = np.zeros(n_games, dtype=np.int64)
+    turn_score = np.zeros(n_games)
+    n_rolls_this_turn = np.zeros(n_games, dtype=np.int64)
+    n_turns = np.zeros(n_games, dtype=np.int64)
+    turn_score_cap = np.minimum(seat_target_turn_score[:, 0], pig_out_turn_score) #a pig out always ends the turn
+    turn_rolls_cap = seat_target_turn_rolls[:, 0].copy()
+    banked_score = np.zeros(n_games) #game score of the player on turn
+    n_parked_games = 0
+
+    while game_index.size > n_parked_games:
+        turn_score += lookup_roll_scores(rng.random(game_index.size), cell_roll_scores, roll_scores, all_possible_score_cumulative_probabilities_array)
+        n_rolls_this_turn += 1
+
+        turn_over = (turn_score >= turn_score_cap) | (n_rolls_this_turn >= turn_rolls_cap)
+        if stop_at_target_game_score: #stop rolling as soon as banking the turn would win the game
+            turn_over |= (banked_score + turn_score) >= target_game_score
+        ended = np.flatnonzero(turn_over)
+        if ended.size == 0:
+            continue
+
+        points_this_turn = turn_score[ended]
+        points_this_turn[points_this_turn >= pig_out_turn_score] = 0.0 #lose all points for the turn on a pig out
+        ended_seat = seat[ended]
+        game_scores[ended, ended_seat] += points_this_turn
+        n_turns[ended] += 1
+
+        won = game_scores[ended, ended_seat] >= target_game_score #the first player to bank the target game score wins
+        finished = ended[won]
+        if finished.size > 0:
+            winner_seat[game_index[finished]] = seat[finished]
+            total_turns[game_index[finished]] = n_turns[finished]
+            n_parked_games += park_finished_games(finished, turn_score, n_rolls_this_turn, banked_score)
+
+        passed = ended[~won] #the next player takes their turn
+        next_seat = (seat[passed] + 1) % n_players
+        seat[passed] = next_seat
+        turn_score[passed] = 0.0
+        n_rolls_this_turn[passed] = 0
+        turn_score_cap[passed] = np.minimum(seat_target_turn_score[passed, next_seat], pig_out_turn_score)
+        turn_rolls_cap[passed] = seat_target_turn_rolls[passed, next_seat]
+        banked_score[passed] = game_scores[passed, next_seat]
+
+        n_parked_games, turn_score, game_index, game_scores, seat, n_rolls_this_turn, n_turns, turn_score_cap, turn_rolls_cap, banked_score, seat_target_turn_rolls, seat_target_turn_score = drop_parked_games(n_parked_games, turn_score, game_index, game_scores, seat, n_rolls_this_turn, n_turns, turn_score_cap, turn_rolls_cap, banked_score, seat_target_turn_rolls, seat_target_turn_score)
+
+    outcome = {}
+    outcome['winner_seat'] = winner_seat
+    outcome['total_turns'] = total_turns
+    return outcome
+
+################################################################################
+##### play one chunk of the tournament #####
+#game g of the tournament belongs to matchup g // games_per_matchup and seats the matchup's policies rotated by g % n_players places
+#module-level so that it can be sent to worker processes. returns win counts only, never the individual games
+def play_tournament_chunk(first_game, n_games, seed_sequence, tournament_settings):
+    matchups = tournament_settings['matchups']
+    policies = tournament_settings['policies']
+    n_matchups, n_players = matchups.shape
+    games_per_matchup = tournament_settings['games_per_matchup']
+
+    tournament_game = np.arange(first_game, first_game + n_games)
+    matchup_index = tournament_game // games_per_matchup
+    rotation = (tournament_game % games_per_matchup) % n_players
+    seat_policy = matchups[matchup_index[:, None], (np.arange(n_players)[None, :] + rotation[:, None]) % n_players] #policy index of every seat of every game
+    outcome = play_games_batch(policies[seat_policy, 0], policies[seat_policy, 1], tournament_settings['target_game_score'], tournament_settings['all_possible_scores_array'], tournament_settings['all_possible_score_cumulative_probabilities_array'], rng=np.random.default_rng(seed_sequence), stop_at_target_game_score=tournament_settings['stop_at_target_game_score'])
+
+    n_policies = len(policies)
+    winner_policy = seat_policy[np.arange(n_games), outcome['winner_seat']]
+    counts = {}
+    counts['matchup_games'] = np.bincount(matchup_index, minlength=n_matchups)
+    counts['matchup_wins'] = np.bincount(matchup_index*n_policies + winner_policy, minlength=n_matchups*n_policies).reshape(n_matchups, n_policies)
+    counts['seat_wins'] = np.bincount(outcome['winner_seat'], minlength=n_players)
+    counts['total_turns'] = int(outcome['total_turns'].sum())
+    return counts
+
+def play_tournament_chunk_from_args(chunk_args):
+    return play_tournament_chunk(*chunk_args)
+
+################################################################################
+##### round-robin tournament #####
+#by default every set of n_players different policies meets once (every pair of policies for 2 players). pass matchups to choose the tables
+#yourself: each matchup lists the policy index of every seat, and a policy may take several seats
+#returns a dictionary with:
+#  win_rate_matrix[i, j]: share of the games with both policy i and policy j at the table that policy i won (nan when they never met).
+#                         with 2 players win_rate_matrix[i, j] + win_rate_matrix[j, i] = 1; with more players someone else may win
+#  win_rate[i]: share of the games policy i played that it won (a fair share is 1/n_players), and ranking, the policies from best to worst
+#  seat_win_rate[s]: share of all games won from seat s, which shows the advantage of moving first
+#every rate comes with a wilson confidence interval (..._lower, ..._upper)
+def play_round_robin_tournament(all_possible_scores_array, all_possible_score_cumulative_probabilities_array, policies, n_players=2, target_game_score=100, games_per_matchup=default_games_per_matchup, matchups=None, seed=None, n_workers=1, games_per_chunk=default_games_per_chunk, stop_at_target_game_score=False, confidence=0.95):
+    if not min_players <= n_players <= max_players:
+        raise ValueError('a game has {} to {} players, not {}'.format(min_players, max_players, n_players))
+    policies = np.asarray(policies, dtype=float).reshape(-1, 2)
+    check_turn_policy(policies[:, 0], policies[:, 1], stop_at_target_game_score) #before any worker starts
+    check_scoring_outcomes(all_possible_scores_array, all_possible_score_cumulative_probabilities_array)
+    n_policies = len(policies)
+    if matchups is None:
+        if n_policies < n_players:
+            raise ValueError('{} policies cannot fill a {}-player table; pass matchups to let a policy take several seats'.format(n_policies, n_players))
+        matchups = list(itertools.combinations(range(n_policies), n_players))
+    matchups = np.asarray(matchups, dtype=np.int64).reshape(-1, n_players)
+    if (matchups < 0).any() or (matchups >= n_policies).any():
+        raise ValueError('matchups refer to policies that do not exist')
+    n_matchups = len(matchups)
+    n_games = n_matchups * games_per_matchup
+
+    tournament_settings = {}
+    tournament_settings['matchups'] = matchups
+    tournament_settings['policies'] = policies
+    tournament_settings['games_per_matchup'] = games_per_matchup
+    tournament_settings['target_game_score'] = target_game_score
+    tournament_settings['all_possible_scores_array'] = np.asarray(all_possible_scores_array, dtype=float)
+    tournament_settings['all_possible_score_cumulative_probabilities_array'] = np.asarray(all_possible_score_cumulative_probabilities_array, dtype=float)
+    tournament_settings['stop_at_target_game_score'] = stop_at_target_game_score
+
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    chunk_starts = np.arange(0, n_games, games_per_chunk)
+    chunk_args = [(int(first_game), int(min(games_per_chunk, n_games - first_game)), chunk_seed_sequence, tournament_settings) for first_game, chunk_seed_sequence in zip(chunk_starts, seed_sequence.spawn(len(chunk_starts)))]
+    if n_workers <= 1:
+        chunk_counts = map(play_tournament_chunk_from_args, chunk_args)
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        chunk_counts = executor.map(play_tournament_chunk_from_args, chunk_args)
+    matchup_games = np.zeros(n_matchups, dtype=np.int64)
+    matchup_wins = np.zeros((n_matchups, n_policies), dtype=np.int64)
+    seat_wins = np.zeros(n_players, dtype=np.int64)
+    total_turns = 0
+    try:
+        for counts in chunk_counts:
+            matchup_games += counts['matchup_games']
+            matchup_wins += counts['matchup_wins']
+            seat_wins += counts['seat_wins']
+            total_turns += counts['total_turns']
+    finally:
+        if n_workers > 1:
+            executor.shutdown()
+
+    #head-to-head and overall counts. a policy that takes several seats at a table is counted once for that table
+    head_to_head_games = np.zeros((n_policies, n_policies), dtype=np.int64)
+    head_to_head_wins = np.zeros((n_policies, n_policies), dtype=np.int64)
+    games_played = np.zeros(n_policies, dtype=np.int64)
+    games_won = np.zeros(n_policies, dtype=np.int64)
+    for matchup_index in range(n_matchups):
+        at_table = np.unique(matchups[matchup_index])
+        games_played[at_table] += matchup_games[matchup_index]
+        games_won[at_table] += matchup_wins[matchup_index, at_table]
+        head_to_head_games[np.ix_(at_table, at_table)] += matchup_games[matchup_index]
+        head_to_head_wins[np.ix_(at_table, at_table)] += matchup_wins[matchup_index, at_table][:, None]
+    np.fill_diagonal(head_to_head_games, 0)
+    np.fill_diagonal(head_to_head_wins, 0)
+
+    tournament = {}
+    tournament['policies'] = policies
+    tournament['n_players'] = n_players
+    tournament['matchups'] = matchups
+    tournament['matchup_games'] = matchup_games
+    tournament['matchup_wins'] = matchup_wins
+    tournament['head_to_head_games'] = head_to_head_games
+    tournament['head_to_head_wins'] = head_to_head_wins
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tournament['win_rate_matrix'] = np.where(head_to_head_games > 0, head_to_head_wins / head_to_head_games, np.nan)
+        tournament['win_rate_matrix_lower'], tournament['win_rate_matrix_upper'] = [np.where(head_to_head_games > 0, limits, np.nan) for limits in wilson_interval(head_to_head_wins, head_to_head_games, confidence)]
+        tournament['games_played'] = games_played
+        tournament['games_won'] = games_won
+        tournament['win_rate'] = np.where(games_played > 0, games_won / games_played, np.nan)
+    tournament['win_rate_lower'], tournament['win_rate_upper'] = wilson_interval(games_won, games_played, confidence)
+    tournament['ranking'] = np.argsort(-np.nan_to_num(tournament['win_rate'], nan=-1.0), kind='stable')
+    tournament['seat_win_rate'] = seat_wins / n_games
+    tournament['seat_win_rate_lower'], tournament['seat_win_rate_upper'] = wilson_interval(seat_wins, n_games, confidence)
+    tournament['mean_turns_per_game'] = total_turns / n_games
+    return tournament
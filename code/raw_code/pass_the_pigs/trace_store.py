@@ -0,0 +1,264 @@
+################################################################################
+##### description #####
+#columnar store for the per-turn traces of simulated games (rolls and banked points of every turn)
+#turns are kept in typed arrays, 3 bytes per turn: rolls as uint8 and banked points as uint16 quarter points. games are kept in CSR form:
+#the turns of game g are rolls[turn_offsets[g]:turn_offsets[g+1]]. every game also records the strategy (policy) that played it
+#the arrays grow geometrically, so appending n turns costs O(n) overall. once they would grow past ram_budget_bytes they move to
+#memory-mapped .npy files in spill_dir and keep growing there, so the store can hold far more turns than fit in memory
+#without a spill_dir the store spills to a temporary directory of its own, which close() (or leaving a with block) deletes
+#every accessor returns a view into the store, never a copy of the turn data
+
+################################################################################
+##### import packages #####
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pass_the_pigs.atomic_files import atomic_path, atomic_write
+from pass_the_pigs.exact import points_to_quarter_points, quarter_points_per_point
+
+################################################################################
+##### settings #####
+default_ram_budget_bytes = 1 << 30 #1 GB, about 350M turns
+default_initial_n_turns = 1 << 16
+default_initial_n_games = 1 << 13
+store_state_file_name = 'trace_store.json'
+turn_columns = {'rolls': np.uint8, 'quarter_points': np.uint16}
+game_columns = {'turn_offsets': np.int64, 'game_strategy': np.uint16}
+
+################################################################################
+##### turn trace store #####
+class TurnTraceStore:
+    def __init__(self, ram_budget_bytes=default_ram_budget_bytes, spill_dir=None, initial_n_turns=default_initial_n_turns, initial_n_games=default_initial_n_games):
+        self.ram_budget_bytes = ram_budget_bytes
+        self.spill_dir = spill_dir
+        self.owns_spill_dir = False #True once the store has spilled to a temporary directory it made itself
+        self.spilled = False
+        self.writable = True
+        self.n_games = 0
+        self.n_turns = 0
+        self.strategy_blocks = [] #[strategy, first_game, end_game] for every run of games appended with the same strategy
+        self.columns = {}
+        for column, dtype in turn_columns.items():
+            self.columns[column] = np.zeros(initial_n_turns, dtype=dtype)
+        for column, dtype in game_columns.items():
+            self.columns[column] = np.zeros(initial_n_games + (column == 'turn_offsets'), dtype=dtype) #one more offset than games
+
+    ##### storage #####
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.columns.values())
+
+    #grows every column that is too small to hold n_turns turns and n_games games, moving the store to disk first if the grown store would not fit the budget
+    def reserve(self, n_turns, n_games):
+        new_sizes = {}
+        for column in self.columns:
+            needed = (n_turns if column in turn_columns else n_games + (column == 'turn_offsets'))
+            size = len(self.columns[column])
+            if needed > size:
+                while size < needed:
+                    size *= 2
+                new_sizes[column] = size
+        if not new_sizes:
+            return
+        grown_nbytes = self.nbytes + sum((size - len(self.columns[column])) * self.columns[column].itemsize for column, size in new_sizes.items())
+        if (not self.spilled) and (grown_nbytes > self.ram_budget_bytes):
+            self.spill()
+        for column, size in new_sizes.items():
+            self.columns[column] = self.resized_column(column, size)
+
+    def resized_column(self, column, size):
+        old_array = self.columns[column]
+        used = self.n_turns if column in turn_columns else self.n_games + (column == 'turn_offsets')
+        if not self.spilled:
+            new_array = np.zeros(size, dtype=old_array.dtype)
+            new_array[:used] = old_array[:used]
+            return new_array
+        #a memory map cannot grow in place, so the column is copied to a bigger file that then replaces the old one
+        with atomic_path(os.path.join(self.spill_dir, column + '.npy')) as temporary_path:
+            new_array = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=old_array.dtype, shape=(size,))
+            new_array[:used] = old_array[:used]
+            new_array.flush()
+            old_array.flush()
+            del old_array, self.columns[column] #unmap the old file before it is replaced (windows refuses to replace a mapped file)
+        return new_array
+
+    #moves every column to a memory-mapped .npy file in spill_dir (a new temporary directory if none was given)
+    def spill(self):
+        if self.spilled:
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='pass_the_pigs_traces_')
+            self.owns_spill_dir = True
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.spilled = True
+        for column, array in list(self.columns.items()):
+            mapped_array = np.lib.format.open_memmap(os.path.join(self.spill_dir, column + '.npy'), mode='w+', dtype=array.dtype, shape=array.shape)
+            mapped_array[:] = array
+            self.columns[column] = mapped_array
+        self.flush()
+
+    ##### append games #####
+    #rolls_per_turn, points_per_turn and turn_offsets in the columnar form returned by simulate_games_batch(record_turns=True)
+    def append_games(self, rolls_per_turn, points_per_turn, turn_offsets, strategy=0):
+        if not self.writable:
+            raise ValueError('this trace store was opened read-only')
+        turn_offsets = np.asarray(turn_offsets, dtype=np.int64)
+        n_new_games = len(turn_offsets) - 1
+        n_new_turns = int(turn_offsets[-1] - turn_offsets[0])
+        rolls_per_turn = np.asarray(rolls_per_turn)[turn_offsets[0]:turn_offsets[-1]]
+        quarter_points = points_to_quarter_points(np.asarray(points_per_turn)[turn_offsets[0]:turn_offsets[-1]])
+        if n_new_turns > 0:
+            if (rolls_per_turn.min() < 0) or (rolls_per_turn.max() > np.iinfo(np.uint8).max):
+                raise ValueError('the store holds at most {} rolls per turn'.format(np.iinfo(np.uint8).max))
+            if (quarter_points.min() < 0) or (quarter_points.max() > np.iinfo(np.uint16).max):
+                raise ValueError('the store holds at most {} points per turn'.format(np.iinfo(np.uint16).max / quarter_points_per_point))
+        if not 0 <= strategy <= np.iinfo(np.uint16).max:
+            raise ValueError('strategies are numbered 0 to {}'.format(np.iinfo(np.uint16).max))
+
+        self.reserve(self.n_turns + n_new_turns, self.n_games + n_new_games)
+        new_turns = slice(self.n_turns, self.n_turns + n_new_turns)
+        self.columns['rolls'][new_turns] = rolls_per_turn
+        self.columns['quarter_points'][new_turns] = quarter_points
+        self.columns['turn_offsets'][self.n_games+1:self.n_games+n_new_games+1] = turn_offsets[1:] - turn_offsets[0] + self.n_turns
+        self.columns['game_strategy'][self.n_games:self.n_games+n_new_games] = strategy
+        if self.strategy_blocks and (self.strategy_blocks[-1][0] == strategy): #extends the last run of games
+            self.strategy_blocks[-1][2] += n_new_games
+        else:
+            self.strategy_blocks.append([strategy, self.n_games, self.n_games + n_new_games])
+        self.n_games += n_new_games
+        self.n_turns += n_new_turns
+
+    #same, from the outcome dictionary of simulate_games_batch
+    def append_outcome(self, outcome, strategy=0):
+        self.append_games(outcome['rolls_per_turn'], outcome['points_per_turn'], outcome['turn_offsets'], strategy=strategy)
+
+    ##### views #####
+    @property
+    def rolls(self):
+        return self.columns['rolls'][:self.n_turns]
+
+    @property
+    def quarter_points(self):
+        return self.columns['quarter_points'][:self.n_turns]
+
+    @property
+    def turn_offsets(self):
+        return self.columns['turn_offsets'][:self.n_games+1]
+
+    @property
+    def game_strategy(self):
+        return self.columns['game_strategy'][:self.n_games]
+
+    @property
+    def turns_per_game(self):
+        return np.diff(self.turn_offsets)
+
+    #the turns of one game: (rolls, quarter_points)
+    def game_turns(self, game):
+        turns = slice(self.turn_offsets[game], self.turn_offsets[game+1])
+        return self.rolls[turns], self.quarter_points[turns]
+
+    #one dictionary of views per run of games played with this strategy: the games' turn_offsets (still counting from the start of the store)
+    #and the rolls and quarter_points of their turns. a strategy appended in one go has a single run
+    def strategy_views(self, strategy):
+        views = []
+        for block_strategy, first_game, end_game in self.strategy_blocks:
+            if block_strategy != strategy:
+                continue
+            turns = slice(self.turn_offsets[first_game], self.turn_offsets[end_game])
+            view = {}
+            view['games'] = slice(first_game, end_game)
+            view['turn_offsets'] = self.turn_offsets[first_game:end_game+1]
+            view['rolls'] = self.rolls[turns]
+            view['quarter_points'] = self.quarter_points[turns]
+            views.append(view)
+        return views
+
+    ##### per-game and per-strategy totals #####
+    #sum of a turn column ('rolls' or 'quarter_points') over the turns of every game. games without turns sum to 0
+    def game_totals(self, column):
+        values = self.columns[column][:self.n_turns]
+        turn_starts = self.turn_offsets[:-1]
+        has_turns = turn_starts < self.turn_offsets[1:]
+        totals = np.zeros(self.n_games, dtype=np.int64)
+        if has_turns.any():
+            totals[has_turns] = np.add.reduceat(values, turn_starts[has_turns], dtype=np.int64)
+        return totals
+
+    #sum of a turn column over all the games of every strategy, indexed by strategy number
+    def strategy_totals(self, column):
+        return np.bincount(self.game_strategy, weights=self.game_totals(column))
+
+    ##### persist #####
+    #writes the store's sizes and strategy runs next to the spilled columns, so open_trace_store can read it back
+    def flush(self):
+        if not self.spilled:
+            return
+        for array in self.columns.values():
+            array.flush()
+        state = {'n_games': self.n_games, 'n_turns': self.n_turns, 'strategy_blocks': self.strategy_blocks}
+        state_path = os.path.join(self.spill_dir, store_state_file_name)
+        with atomic_write(state_path) as state_file:
+            json.dump(state, state_file)
+
+    #writes the store to directory, in the same layout as a spilled store, so open_trace_store can read it back
+    #an in-memory store spills to directory, and a store in its own temporary directory moves there; both keep growing in directory afterwards
+    #a store spilled to a spill_dir that was passed in is copied, and keeps growing in spill_dir
+    def save(self, directory):
+        if not self.spilled:
+            self.spill_dir = directory
+            self.spill()
+            return
+        self.flush()
+        if os.path.abspath(directory) == os.path.abspath(self.spill_dir):
+            return
+        os.makedirs(directory, exist_ok=True)
+        for file_name in [column + '.npy' for column in self.columns] + [store_state_file_name]:
+            with atomic_path(os.path.join(directory, file_name)) as temporary_path:
+                shutil.copyfile(os.path.join(self.spill_dir, file_name), temporary_path)
+        if self.owns_spill_dir:
+            self.columns = load_columns(directory, self.writable)
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = directory
+            self.owns_spill_dir = False
+
+    #releases the columns. a temporary spill directory the store made for itself is deleted; a spill_dir that was passed in, or a saved
+    #store, is flushed and kept for open_trace_store. the store cannot be used after it is closed
+    def close(self):
+        if self.spilled and self.writable and not self.owns_spill_dir:
+            self.flush()
+        self.columns = {}
+        if self.owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.owns_spill_dir = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+################################################################################
+##### open a saved or spilled store #####
+#the columns are memory-mapped, so opening a store of any size is immediate. writable=True lets more games be appended
+def open_trace_store(directory, writable=False):
+    with open(os.path.join(directory, store_state_file_name)) as state_file:
+        state = json.load(state_file)
+    trace_store = TurnTraceStore.__new__(TurnTraceStore)
+    trace_store.ram_budget_bytes = 0
+    trace_store.spill_dir = directory
+    trace_store.owns_spill_dir = False
+    trace_store.spilled = True
+    trace_store.writable = writable
+    trace_store.n_games = state['n_games']
+    trace_store.n_turns = state['n_turns']
+    trace_store.strategy_blocks = state['strategy_blocks']
+    trace_store.columns = load_columns(directory, writable)
+    return trace_store
+
+def load_columns(directory, writable):
+    return {column: np.load(os.path.join(directory, column + '.npy'), mmap_mode='r+' if writable else 'r') for column in list(turn_columns) + list(game_columns)}
@@ -0,0 +1,82 @@
+################################################################################
+##### description #####
+#exact distribution of the points banked in one turn, for strategy 1 (roll a set number of times) and strategy 2 (roll to a target turn score)
+#the distributions themselves are computed by exact.py; the engine keeps the partial results that many policies share
+#strategy_1_score and strategy_2_score only give expectations; these distributions also give the spread and exact tail probabilities
+#distributions live on the quarter-point grid used in exact.py: pmf[q] is the probability of banking q/4 points, and pmf[0] includes every pig out
+
+################################################################################
+##### import packages #####
+import numpy as np
+
+from pass_the_pigs.exact import n_roll_points_pmf, no_pig_out_roll_pmf, quarter_points_per_point, roll_count_turn_pmf_from_points, roll_points_pmf, threshold_to_quarter_points, threshold_turn_pmf_from_visits, turn_pmf_on_grid, turn_score_visits_on_grid
+
+################################################################################
+##### settings #####
+default_fft_min_rolls = 8 #turns with at least this many rolls are convolved through the fft instead of one roll at a time
+
+################################################################################
+##### turn distribution engine #####
+#partial results are cached across calls: the n-roll score distributions for strategy 1, and the visits to each turn score below the
+#target for strategy 2, which are shared by every target turn score and only ever extended
+class TurnDistributionEngine:
+    def __init__(self, all_possible_scores_array, all_possible_score_probabilities_array, fft_min_rolls=default_fft_min_rolls):
+        self.roll_pmf = roll_points_pmf(all_possible_scores_array, all_possible_score_probabilities_array)
+        self.pig_out_prob = self.roll_pmf[0]
+        self.no_pig_out_roll_pmf = no_pig_out_roll_pmf(self.roll_pmf)
+        self.fft_min_rolls = fft_min_rolls
+        self.no_pig_out_points_pmfs = {0: np.ones(1), 1: self.no_pig_out_roll_pmf} #n -> points scored by n rolls in a row without a pig out (total mass P(no pig out)**n)
+        self.turn_score_visits = np.ones(1)
+
+    ##### points from n rolls in a row, over the roll sequences that never pigged out #####
+    def no_pig_out_points_pmf(self, n_rolls):
+        if n_rolls in self.no_pig_out_points_pmfs:
+            return self.no_pig_out_points_pmfs[n_rolls]
+        if n_rolls < self.fft_min_rolls: #short turns: one more roll on top of the longest cached turn that is shorter
+            n_cached_rolls = max(n for n in self.no_pig_out_points_pmfs if n < n_rolls)
+            points_pmf = self.no_pig_out_points_pmfs[n_cached_rolls]
+            for n in range(n_cached_rolls+1, n_rolls+1):
+                points_pmf = np.convolve(points_pmf, self.no_pig_out_roll_pmf)
+                self.no_pig_out_points_pmfs[n] = points_pmf
+            return points_pmf
+        points_pmf = n_roll_points_pmf(self.roll_pmf, n_rolls) #long turns: one fourier transform
+        self.no_pig_out_points_pmfs[n_rolls] = points_pmf
+        return points_pmf
+
+    ##### strategy 1: roll target_turn_rolls times (rounded up, like the game simulations) unless the turn pigs out first #####
+    def roll_count_turn_pmf(self, target_turn_rolls):
+        if target_turn_rolls <= 0:
+            raise ValueError('a turn must allow at least one roll')
+        return roll_count_turn_pmf_from_points(self.no_pig_out_points_pmf(int(np.ceil(target_turn_rolls))))
+
+    ##### strategy 2: roll until the turn score reaches target_turn_score unless the turn pigs out first #####
+    def threshold_turn_pmf(self, target_turn_score):
+        target_turn_quarter_points = threshold_to_quarter_points(target_turn_score)
+        if target_turn_quarter_points > len(self.turn_score_visits): #extend the cached visits, at least doubling them so a sweep of thresholds extends rarely
+            self.turn_score_visits = turn_score_visits_on_grid(self.roll_pmf, max(target_turn_quarter_points, 2*len(self.turn_score_visits)), self.turn_score_visits)
+        return threshold_turn_pmf_from_visits(self.roll_pmf, self.turn_score_visits, target_turn_quarter_points)
+
+    ##### any policy: a roll limit, a target turn score, or both #####
+    def turn_pmf(self, target_turn_rolls=np.inf, target_turn_score=np.inf):
+        if np.isinf(target_turn_rolls) and np.isinf(target_turn_score):
+            raise ValueError('a turn needs a roll limit or a target turn score, otherwise it only ends with a pig out')
+        if np.isinf(target_turn_score):
+            return self.roll_count_turn_pmf(target_turn_rolls)
+        if np.isinf(target_turn_rolls):
+            return self.threshold_turn_pmf(target_turn_score)
+        if target_turn_score <= 0:
+            raise ValueError('a turn must allow at least one roll')
+        return turn_pmf_on_grid(self.roll_pmf, max_turn_rolls=int(np.ceil(target_turn_rolls)), target_turn_grid_points=threshold_to_quarter_points(target_turn_score))
+
+################################################################################
+##### summaries of a turn distribution, in points #####
+def turn_pmf_mean(turn_pmf):
+    return float(np.dot(np.arange(len(turn_pmf)), turn_pmf)) / quarter_points_per_point
+
+def turn_pmf_std(turn_pmf):
+    points = np.arange(len(turn_pmf)) / quarter_points_per_point
+    return float(np.sqrt(max(np.dot(points**2, turn_pmf) - turn_pmf_mean(turn_pmf)**2, 0.0)))
+
+#probability of banking at least this many points
+def turn_pmf_tail_probability(turn_pmf, points):
+    return float(np.sum(turn_pmf[threshold_to_quarter_points(points):]))